@@ -15,6 +15,7 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+import gzip
 import json
 
 import click
@@ -44,6 +45,7 @@ from models.database import get_db, close_db, init_database, bootstrap_data
 
 # 导入日志配置
 from utils.logger import setup_logging, log_request
+from utils.json_provider import init_json_provider
 
 
 # ==================== 应用工厂 ====================
@@ -60,6 +62,9 @@ def create_app(config_name=None):
     if not application.config.get("DEBUG") and application.config.get("SECRET_KEY") in (None, "", "dev-secret-change-in-production"):
         raise ValueError("SECRET_KEY must be set for production")
 
+    # JSON 序列化（orjson 可用时启用）
+    init_json_provider(application)
+
     # 初始化日志
     setup_logging(application)
 
@@ -81,6 +86,9 @@ def create_app(config_name=None):
     # 注册上下文处理器和安全头
     _register_context_and_security(application)
 
+    # 注册 JSON 响应压缩
+    _register_compression(application)
+
     # 注册请求级用户上下文（每请求一次加载用户信息，消除重复查询）
     _register_user_context(application)
 
@@ -176,15 +184,16 @@ def _register_user_context(application):
 
 # ==================== 数据库初始化 ====================
 
-def init_db():
+def init_db(force=False, defer_indexes=False):
     """初始化数据库表和索引 - MySQL
     
     注意：此函数在请求上下文外运行（CLI/启动时），
     必须显式 close_db() 回收连接。
+    defer_indexes=True 时报表类复合索引在后台线程创建（仅用于常驻服务进程）。
     """
     try:
         # 使用 models/database.py 中的初始化函数
-        init_database()
+        init_database(force=force, defer_indexes=defer_indexes)
 
         # 初始化基础数据（部门、管理员账户、停用词等）
         bootstrap_data()
@@ -209,11 +218,12 @@ def _register_cli_commands(application):
     """
     @application.cli.command('init-db')
     @click.option('--silent', is_flag=True, help='静默模式')
-    def cli_init_db(silent):
+    @click.option('--force', is_flag=True, help='忽略结构签名，强制完整检查表/视图/索引')
+    def cli_init_db(silent, force):
         """初始化数据库表、索引和基础数据"""
         if not silent:
             click.echo('🔧 开始初始化数据库...')
-        init_db()
+        init_db(force=force)
         if not silent:
             click.echo('✅ 数据库初始化完成')
 
@@ -271,6 +281,36 @@ def _register_context_and_security(application):
         return response
 
 
+def _register_compression(application):
+    """注册 JSON 响应 gzip 压缩（日志、统计等大响应体）"""
+
+    @application.after_request
+    def compress_json_response(response):
+        """客户端支持 gzip 且 JSON 响应体超过阈值时压缩"""
+        cfg = application.config
+        if (response.status_code != 200 or
+                response.direct_passthrough or
+                response.mimetype != 'application/json' or
+                'Content-Encoding' in response.headers or
+                'gzip' not in request.headers.get('Accept-Encoding', '')):
+            return response
+
+        data = response.get_data()
+        if len(data) < cfg.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=cfg.get('COMPRESS_LEVEL', 4)))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+
+        # 压缩后字节不同，强 ETag 降为弱 ETag（仍可用于 304 协商）
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+
 # ==================== Blueprint 注册 ====================
 
 def _register_all_blueprints(application):
@@ -318,7 +358,7 @@ if __name__ == "__main__":
 
     # 初始化数据库（使用 IF NOT EXISTS，安全地创建缺失的表）
     print()  # 空行分隔
-    init_db()
+    init_db(defer_indexes=True)
 
     # 启动应用
     print("\n" + "=" * 70)
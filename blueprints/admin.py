@@ -6,10 +6,9 @@
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, session
 from werkzeug.security import generate_password_hash
-import pymysql
 import json
 from datetime import datetime, timedelta
-from models.database import get_db
+from models.database import get_db, db_driver
 from utils.backup import BackupManager, get_backup_statistics, BackupTaskManager
 from .decorators import admin_required
 from openpyxl import Workbook, load_workbook
@@ -392,7 +391,7 @@ def users():
                     success_rows += 1
                     detail_items.append({'row': row_no, 'username': username, 'action': 'created'})
 
-            except (ValueError, pymysql.err.IntegrityError) as e:
+            except (ValueError, db_driver.IntegrityError) as e:
                 failed_rows += 1
                 detail_items.append({'row': row_no, 'error': str(e), 'action': 'failed'})
             except Exception as e:
@@ -482,7 +481,7 @@ def users():
 
                 conn.commit()
                 flash('用户已创建', 'success')
-            except pymysql.err.IntegrityError:
+            except db_driver.IntegrityError:
                 flash('用户名或钉钉UserId已存在', 'danger')
             except Exception as e:
                 flash(f'创建失败: {e}', 'danger')
@@ -547,7 +546,7 @@ def users():
 
                 conn.commit()
                 flash('用户信息更新成功', 'success')
-            except pymysql.err.IntegrityError:
+            except db_driver.IntegrityError:
                 flash('用户名或钉钉UserId已存在', 'danger')
         return redirect(url_for('admin.users'))
 
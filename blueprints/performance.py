@@ -6,7 +6,7 @@
 """
 import os
 import re
-import pymysql
+import time
 from datetime import datetime
 from typing import Dict, List, Tuple
 
@@ -15,7 +15,7 @@ from openpyxl import Workbook
 from werkzeug.utils import secure_filename
 
 from config.settings import APP_TITLE, UPLOAD_DIR, EXPORT_DIR
-from models.database import get_db
+from models.database import get_db, db_driver
 from .decorators import login_required, role_required
 from .helpers import require_user_id, build_department_filter, log_import_operation, parse_time_range
 
@@ -30,6 +30,7 @@ ALLOWED_EXTS = {"pdf"}
 # PDF解析函数 - 从领域层 re-export（保持向后兼容）
 from services.domain.pdf_parser import (
     extract_text_from_pdf,
+    extract_first_page_text,
     parse_pdf_text,
     HEADER_PERIOD_RE,
     ROW_RE,
@@ -49,6 +50,23 @@ DEFAULT_QUARTER_COLORS = {
     "不合格": "#FFEBEE",
 }
 
+# 档位映射 / 季度等级为全局配置，变动极少：进程内缓存，写入时主动失效
+REFERENCE_CACHE_TTL = 60  # 秒，兜底多进程部署下其他进程的修改
+_grade_map_cache = {'data': None, 'time': 0.0}
+_quarter_options_cache = {'data': None, 'time': 0.0}
+
+
+def _cache_fresh(cache: dict) -> bool:
+    return cache['data'] is not None and time.time() - cache['time'] < REFERENCE_CACHE_TTL
+
+
+def invalidate_grade_map_cache() -> None:
+    _grade_map_cache['data'] = None
+
+
+def invalidate_quarter_options_cache() -> None:
+    _quarter_options_cache['data'] = None
+
 
 # ==================== 辅助函数 ====================
 
@@ -151,7 +169,7 @@ def build_calculator_dataset(uid: int, year: int, mapping: Dict[str, float]):
             """,
             dept_params + [year],
         )
-    except pymysql.err.OperationalError:
+    except db_driver.OperationalError:
         cur.execute(
             f"""
             SELECT pr.emp_no, pr.name, pr.year, pr.month, pr.grade
@@ -200,6 +218,8 @@ def sort_calculator_data(data, sort):
 
 def get_or_init_grade_map(uid: int = None):
     """获取或初始化档位映射（全局配置，不再按用户隔离）"""
+    if _cache_fresh(_grade_map_cache):
+        return dict(_grade_map_cache['data'])
     conn = get_db()
     cur = conn.cursor()
     cur.execute("SELECT grade, value FROM grade_map")
@@ -211,7 +231,10 @@ def get_or_init_grade_map(uid: int = None):
         conn.commit()
         cur.execute("SELECT grade, value FROM grade_map")
         rows = cur.fetchall()
-    return {row["grade"]: float(row["value"]) for row in rows}
+    mapping = {row["grade"]: float(row["value"]) for row in rows}
+    _grade_map_cache['data'] = mapping
+    _grade_map_cache['time'] = time.time()
+    return dict(mapping)
 
 
 def normalize_color(value: str, fallback: str) -> str:
@@ -240,10 +263,13 @@ def set_quarter_grade_options(uid: int, entries: List[Tuple[str, str]], default_
             (grade, idx, 1 if grade == default_grade else 0, color),
         )
     conn.commit()
+    invalidate_quarter_options_cache()
 
 
 def get_quarter_grade_options(uid: int):
     """获取季度等级选项（全局配置，不再按用户隔离）"""
+    if _cache_fresh(_quarter_options_cache):
+        return [dict(opt) for opt in _quarter_options_cache['data']]
     conn = get_db()
     cur = conn.cursor()
     cur.execute(
@@ -257,7 +283,7 @@ def get_quarter_grade_options(uid: int):
             "SELECT grade, display_order, is_default, color FROM quarter_grade_options ORDER BY display_order"
         )
         rows = cur.fetchall()
-    return [
+    options = [
         {
             "grade": row["grade"],
             "is_default": bool(row["is_default"]),
@@ -265,6 +291,9 @@ def get_quarter_grade_options(uid: int):
         }
         for row in rows
     ]
+    _quarter_options_cache['data'] = options
+    _quarter_options_cache['time'] = time.time()
+    return [dict(opt) for opt in options]
 
 
 def list_employees():
@@ -405,22 +434,7 @@ def peek_pdf_date(pdf_path):
     Rapidly extract date from PDF header (Process only first page)
     Returns: (year, month) or (None, None)
     """
-    text = ""
-    try:
-        import pdfplumber
-        # pdfplumber is robust but slow. processing just 1 page is fast enough.
-        with pdfplumber.open(pdf_path) as pdf:
-            if pdf.pages:
-                text = pdf.pages[0].extract_text() or ""
-    except Exception:
-        try:
-            from PyPDF2 import PdfReader
-            reader = PdfReader(pdf_path)
-            if reader.pages:
-                text = reader.pages[0].extract_text() or ""
-        except Exception:
-            pass
-            
+    text = extract_first_page_text(pdf_path)
     if not text:
         return None, None
         
@@ -1096,6 +1110,7 @@ def calculator():
                 (grade, value),
             )
         conn.commit()
+        invalidate_grade_map_cache()
         flash("分值设置已保存。", "success")
         return redirect(url_for("performance.calculator", sort=sort, year=year))
 
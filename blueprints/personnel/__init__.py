@@ -6,7 +6,6 @@
 """
 import json
 import os
-import pymysql
 from collections import Counter
 from datetime import date, datetime, timedelta
 from io import BytesIO
@@ -5,7 +5,7 @@ import os
 from flask import render_template, request, redirect, url_for, flash, jsonify, send_file, session, current_app
 
 from config.settings import APP_TITLE, EXPORT_DIR
-from models.database import get_db, close_db, get_year_month_concat
+from models.database import get_db, close_db, YEAR_MONTH_CONCAT
 from ..decorators import login_required, manager_required
 from ..helpers import (
     current_user_id, require_user_id, get_accessible_department_ids,
@@ -1162,11 +1162,11 @@ def api_students_list():
         perf_params = [emp_no]
 
         if start_month:
-            perf_query += f" AND ({get_year_month_concat()}) >= %s"
+            perf_query += f" AND ({YEAR_MONTH_CONCAT}) >= %s"
             perf_params.append(start_month)
 
         if end_month:
-            perf_query += f" AND ({get_year_month_concat()}) <= %s"
+            perf_query += f" AND ({YEAR_MONTH_CONCAT}) <= %s"
             perf_params.append(end_month)
 
         perf_query += " ORDER BY year, month"
@@ -21,7 +21,6 @@ from . import (
 )
 import json
 import os
-import pymysql
 from datetime import date, datetime
 from io import BytesIO
 from openpyxl import Workbook, load_workbook
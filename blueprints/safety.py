@@ -5,16 +5,19 @@
 负责安全检查数据管理、记录查询、分析统计等功能
 注意: 使用created_by字段设计，便于后续权限改造
 """
+import heapq
 import os
 import re
 from datetime import datetime, timedelta
+from itertools import chain
+from operator import itemgetter
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, session, current_app
 from openpyxl import Workbook, load_workbook
 from werkzeug.utils import secure_filename
 
 from config.settings import APP_TITLE, EXPORT_DIR, UPLOAD_DIR
-from models.database import get_db
+from models.database import get_db, DatabaseManager
 from .decorators import login_required, role_required, manager_required, admin_required
 from .helpers import require_user_id, get_accessible_department_ids, build_department_filter, parse_time_range, build_date_filter_sql, log_import_operation, validate_employee_access
 
@@ -858,9 +861,6 @@ def export():
     work_type_filter = request.args.get("work_type", "").strip()
     rectification_status_filter = request.args.get("rectification_status", "").strip()
 
-    conn = get_db()
-    cur = conn.cursor()
-
     # 使用部门过滤机制
     dept_ids = get_accessible_department_ids()
     if not dept_ids:
@@ -899,19 +899,19 @@ def export():
 
     base_query += " ORDER BY sr.inspection_date DESC"
 
-    cur.execute(base_query, tuple(params))
-    rows = cur.fetchall()
+    # 导出可能涉及大量记录：流式读取并写入 write_only 工作簿，避免整表驻留内存
+    rows = DatabaseManager.execute_stream(base_query, tuple(params))
+    first_row = next(rows, None)
 
-    if not rows:
+    if first_row is None:
         flash("无数据可导出", "warning")
         return redirect(url_for("safety.records"))
 
     filename_date = datetime.now().strftime("%Y%m%d_%H%M%S")
     xlsx_path = os.path.join(EXPORT_DIR, f"安全检查记录_{filename_date}.xlsx")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "安全检查记录"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("安全检查记录")
 
     headers = [
         "类别", "检查日期", "地点", "存在隐患和问题", "整改措施及其它意见",
@@ -920,7 +920,7 @@ def export():
     ]
     ws.append(headers)
 
-    for row in rows:
+    for row in chain((first_row,), rows):
         ws.append([
             row["category"], row["inspection_date"], row["location"] or "",
             row["hazard_description"] or "", row["corrective_measures"] or "",
@@ -1258,7 +1258,7 @@ def api_analytics_top_loss_items():
             item_scores[item] = item_scores.get(item, 0) + score
 
     # 排序并取Top 10
-    sorted_items = sorted(item_scores.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_items = heapq.nlargest(10, item_scores.items(), key=itemgetter(1))
 
     # 转换为ECharts横向条形图格式（Y轴是项目名，X轴是分值）
     # 规范化分值显示：整数显示为整数,小数保留一位
@@ -1399,7 +1399,7 @@ def api_analytics_top_contributors():
         contributor_counts[rectifier] = contributor_counts.get(rectifier, 0) + 1
 
     # 排序并取Top 10
-    sorted_contributors = sorted(contributor_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_contributors = heapq.nlargest(10, contributor_counts.items(), key=itemgetter(1))
 
     result = {
         "names": [item[0] for item in sorted_contributors],
@@ -1615,7 +1615,7 @@ def api_analytics_top_frequency_items():
         if score > 0:
             item_counts[item] = item_counts.get(item, 0) + 1
 
-    sorted_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_items = heapq.nlargest(10, item_counts.items(), key=itemgetter(1))
 
     result = {
         "items": [item[0] for item in sorted_items],
@@ -1747,7 +1747,7 @@ def api_analytics_dept_issue_compare():
             dept_counts[row['dept_name']] = dept_counts.get(row['dept_name'], 0) + 1
 
     result = [{"name": name, "count": count}
-              for name, count in sorted(dept_counts.items(), key=lambda x: x[1], reverse=True)]
+              for name, count in sorted(dept_counts.items(), key=itemgetter(1), reverse=True)]
     return jsonify(result)
 
 
@@ -1823,5 +1823,5 @@ def api_analytics_dept_risk_compare():
             dept_risk[dept] = dept_risk.get(dept, 0) + 1
 
     result = [{"name": dept, "count": count}
-              for dept, count in sorted(dept_risk.items(), key=lambda x: x[1], reverse=True)]
+              for dept, count in sorted(dept_risk.items(), key=itemgetter(1), reverse=True)]
     return jsonify(result)
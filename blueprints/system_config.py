@@ -4,15 +4,81 @@
 系统配置管理Blueprint
 提供算法参数配置、停用词管理、AI提供商配置的管理界面和API接口
 """
-from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for, current_app
 from blueprints.decorators import admin_required
 from services.algorithm_config_service import AlgorithmConfigService
-from models.database import get_db
+from services.ai_config_service import AIConfigService
+from services.ai_prompt_config_service import AIPromptConfigService
+from services.text_mining_service import TextMiningService
+from models.database import get_db, db_driver, bootstrap_stopwords
+import codecs
 import json
+import re
+from functools import lru_cache
 
 system_config_bp = Blueprint('system_config', __name__, url_prefix='/system/config')
 APP_TITLE = "乘务数字化管理平台"
 
+# 停用词批量导入/删除每批条数（控制单条 SQL 大小，避免超出 max_allowed_packet）
+STOPWORD_IMPORT_BATCH_SIZE = 1000
+
+# AI 提示语单次提交上限（字节）
+AI_PROMPT_MAX_BYTES = 64 * 1024
+
+# 可走 ngram 全文索引的关键词：至少 2 个汉字（ngram_token_size 默认为 2）
+_FULLTEXT_KEYWORD_RE = re.compile(r'^[\u4e00-\u9fa5]{2,}$')
+
+# 全文索引不存在（ER_FT_MATCHING_KEY_NOT_FOUND）
+_ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+
+def _conditional_json(payload):
+    """按响应体内容生成 ETag，客户端缓存一致时返回 304（省去传输）"""
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@lru_cache(maxsize=1)
+def _ai_templates_body():
+    """AI 提供商模板响应体（模板为模块常量，进程内只序列化一次）"""
+    return current_app.json.dumps({
+        'success': True,
+        'templates': AIConfigService.get_provider_templates()
+    })
+
+
+def _parse_stopword_file(stream):
+    """
+    逐行解码上传的停用词文件（UTF-8 优先，失败回退 GBK）
+
+    不整体读入内存，峰值内存只与去重后的词数相关。
+    按原始字节行迭代并用增量解码器解码，不依赖 TextIOWrapper：
+    Python 3.11 以前 SpooledTemporaryFile 缺少 readable()/seekable()，无法被包装。
+
+    Returns:
+        (非空行数, 去重后的有效停用词列表)；编码均不支持时返回 None
+    """
+    for encoding in ('utf-8', 'gbk'):
+        stream.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            total = 0
+            words = {}
+            for raw in stream:
+                # final=True：每行都是完整的字节序列，截断的多字节字符直接报错
+                word = decoder.decode(raw, final=True).strip()
+                if not word:
+                    continue
+                total += 1
+                if len(word) <= 50:
+                    words[word] = None
+            return total, list(words)
+        except UnicodeDecodeError:
+            continue
+    return None
+
 
 @system_config_bp.route('/algorithm')
 @admin_required
@@ -24,17 +90,27 @@ def algorithm_config_page():
 @system_config_bp.route('/api/current-config', methods=['GET'])
 @admin_required
 def api_get_current_config():
-    """API: 获取当前生效的配置"""
+    """API: 获取当前生效的配置（按配置版本号协商缓存）"""
     try:
-        # 获取配置数据
-        config_data = AlgorithmConfigService.get_active_config()
-        config_info = AlgorithmConfigService.get_current_info()
+        # 所有写操作都会自增 config_version，版本未变时直接返回 304
+        # gzip 压缩后 ETag 降为弱 ETag，客户端回传 W/"..."，需按弱比较匹配
+        etag = f'algo-config-v{AlgorithmConfigService.get_config_version()}'
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            # 获取配置数据
+            config_data = AlgorithmConfigService.get_active_config()
+            config_info = AlgorithmConfigService.get_current_info()
 
-        return jsonify({
-            'success': True,
-            'config': config_data,
-            'info': config_info
-        })
+            response = jsonify({
+                'success': True,
+                'config': config_data,
+                'info': config_info
+            })
+        # 304 与 200 携带相同的 ETag / Cache-Control，客户端据此继续协商
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({
             'success': False,
@@ -292,12 +368,12 @@ def api_get_logs():
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
 
-        logs = AlgorithmConfigService.get_logs(limit, offset)
+        logs, total = AlgorithmConfigService.get_logs(limit, offset)
 
         return jsonify({
             'success': True,
             'logs': logs,
-            'total': len(logs)
+            'total': total
         })
 
     except Exception as e:
@@ -371,6 +447,58 @@ def stopwords_page():
     return render_template('system_config/stopwords.html', title='停用词管理 | ' + APP_TITLE)
 
 
+def _query_stopwords(cur, keyword, category, per_page, offset, use_fulltext):
+    """
+    按关键词/分类分页查询停用词
+
+    Returns:
+        (当前页行列表, 总数)
+    """
+    # Build query with filters
+    where_clauses = []
+    params = []
+
+    if keyword:
+        if use_fulltext:
+            # 中文关键词走 ngram 全文索引（短语匹配），避免前导通配符全表扫描
+            where_clauses.append("MATCH(word) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(f'"{keyword}"')
+        else:
+            # 单字、含非中文字符（ngram 无法覆盖）或全文索引不可用时，回退 LIKE
+            where_clauses.append("word LIKE %s")
+            params.append(f'%{keyword}%')
+
+    if category:
+        where_clauses.append("category = %s")
+        params.append(category)
+
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+
+    # Get paginated results with total count in one round-trip
+    cur.execute(
+        f"""SELECT id, word, category,
+                   DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%s') AS created_at,
+                   COUNT(*) OVER() AS total
+            FROM stopwords
+            WHERE {where_sql}
+            ORDER BY category DESC, id DESC
+            LIMIT %s OFFSET %s""",
+        params + [per_page, offset]
+    )
+    rows = cur.fetchall()
+
+    if rows:
+        total = rows[0]['total']
+        # 行字典已与前端字段一致，仅剔除窗口统计列，无需逐行重建
+        for row in rows:
+            del row['total']
+    else:
+        # 页码越界时窗口函数无行可返回，单独补查总数
+        cur.execute(f"SELECT COUNT(*) AS cnt FROM stopwords WHERE {where_sql}", params)
+        total = cur.fetchone()['cnt']
+    return rows, total
+
+
 @system_config_bp.route('/api/stopwords', methods=['GET'])
 @admin_required
 def api_get_stopwords():
@@ -384,49 +512,19 @@ def api_get_stopwords():
         keyword = request.args.get('keyword', '').strip()
         category = request.args.get('category', '')
 
-        # Build query with filters
-        where_clauses = []
-        params = []
-
-        if keyword:
-            where_clauses.append("word LIKE %s")
-            params.append(f'%{keyword}%')
-
-        if category:
-            where_clauses.append("category = %s")
-            params.append(category)
-
-        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-
-        # Get total count
-        cur.execute(f"SELECT COUNT(*) AS cnt FROM stopwords WHERE {where_sql}", params)
-        total = cur.fetchone()['cnt']
-
-        # Get paginated results
         offset = (page - 1) * per_page
-        cur.execute(
-            f"""SELECT id, word, category, created_at
-                FROM stopwords
-                WHERE {where_sql}
-                ORDER BY category DESC, id DESC
-                LIMIT %s OFFSET %s""",
-            params + [per_page, offset]
-        )
-        rows = cur.fetchall()
-
-        stopwords = [
-            {
-                'id': row['id'],
-                'word': row['word'],
-                'category': row['category'],
-                'created_at': str(row['created_at']) if row['created_at'] else None
-            }
-            for row in rows
-        ]
+        use_fulltext = bool(keyword) and bool(_FULLTEXT_KEYWORD_RE.match(keyword))
+        try:
+            rows, total = _query_stopwords(cur, keyword, category, per_page, offset, use_fulltext)
+        except (db_driver.OperationalError, db_driver.ProgrammingError) as e:
+            # 全文索引尚未建成（延迟/在线建索引未完成或失败）时回退 LIKE 查询
+            if not use_fulltext or not e.args or e.args[0] != _ER_FT_MATCHING_KEY_NOT_FOUND:
+                raise
+            rows, total = _query_stopwords(cur, keyword, category, per_page, offset, False)
 
         return jsonify({
             'success': True,
-            'stopwords': stopwords,
+            'stopwords': rows,
             'total': total,
             'page': page,
             'per_page': per_page,
@@ -445,8 +543,6 @@ def api_get_stopwords():
 def api_add_stopword():
     """API: 添加单个停用词"""
     try:
-        from services.text_mining_service import TextMiningService
-
         data = request.get_json()
         word = data.get('word', '').strip()
 
@@ -501,8 +597,6 @@ def api_add_stopword():
 def api_delete_stopword(stopword_id):
     """API: 删除单个停用词"""
     try:
-        from services.text_mining_service import TextMiningService
-
         conn = get_db()
         cur = conn.cursor()
 
@@ -541,8 +635,6 @@ def api_delete_stopword(stopword_id):
 def api_batch_delete_stopwords():
     """API: 批量删除停用词"""
     try:
-        from services.text_mining_service import TextMiningService
-
         data = request.get_json()
         ids = data.get('ids', [])
 
@@ -555,11 +647,19 @@ def api_batch_delete_stopwords():
         conn = get_db()
         cur = conn.cursor()
 
-        # Delete selected stopwords
-        placeholders = ','.join(['%s'] * len(ids))
-        cur.execute(f"DELETE FROM stopwords WHERE id IN ({placeholders})", ids)
-        deleted_count = cur.rowcount
-        conn.commit()
+        # Delete selected stopwords in one explicit transaction, chunking huge IN lists
+        deleted_count = 0
+        conn.begin()
+        try:
+            for i in range(0, len(ids), STOPWORD_IMPORT_BATCH_SIZE):
+                batch = ids[i:i + STOPWORD_IMPORT_BATCH_SIZE]
+                placeholders = ','.join(['%s'] * len(batch))
+                cur.execute(f"DELETE FROM stopwords WHERE id IN ({placeholders})", batch)
+                deleted_count += cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
         # Clear cache
         TextMiningService.clear_cache()
@@ -581,8 +681,6 @@ def api_batch_delete_stopwords():
 def api_import_stopwords():
     """API: 批量导入停用词（从txt文件）"""
     try:
-        from services.text_mining_service import TextMiningService
-
         if 'file' not in request.files:
             return jsonify({
                 'success': False,
@@ -596,58 +694,51 @@ def api_import_stopwords():
                 'error': '请选择文件'
             }), 400
 
-        # Read file content
-        try:
-            content = file.read().decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                file.seek(0)
-                content = file.read().decode('gbk')
-            except Exception:
-                return jsonify({
-                    'success': False,
-                    'error': '文件编码不支持，请使用 UTF-8 或 GBK 编码'
-                }), 400
-
-        # Parse words (one per line)
-        words = [line.strip() for line in content.split('\n') if line.strip()]
-
-        if not words:
+        # Stream-decode file line by line (one word per line)
+        parsed = _parse_stopword_file(file.stream)
+        if parsed is None:
             return jsonify({
                 'success': False,
-                'error': '文件中没有有效的停用词'
+                'error': '文件编码不支持，请使用 UTF-8 或 GBK 编码'
             }), 400
 
-        # Filter valid words
-        valid_words = [w for w in words if len(w) <= 50]
+        total_words, valid_words = parsed
+
+        if not total_words:
+            return jsonify({
+                'success': False,
+                'error': '文件中没有有效的停用词'
+            }), 400
 
         conn = get_db()
         cur = conn.cursor()
 
-        # Insert words, ignore duplicates
+        # Batch insert in one explicit transaction, ignore duplicates
+        # (rowcount counts only newly inserted rows)
         inserted_count = 0
-        for word in valid_words:
-            try:
-                cur.execute(
+        conn.begin()
+        try:
+            for i in range(0, len(valid_words), STOPWORD_IMPORT_BATCH_SIZE):
+                batch = valid_words[i:i + STOPWORD_IMPORT_BATCH_SIZE]
+                cur.executemany(
                     "INSERT IGNORE INTO stopwords (word, category) VALUES (%s, 'custom')",
-                    (word,)
+                    [(word,) for word in batch]
                 )
-                if cur.rowcount > 0:
-                    inserted_count += 1
-            except Exception:
-                continue
-
-        conn.commit()
+                inserted_count += cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
         # Clear cache
         TextMiningService.clear_cache()
 
         return jsonify({
             'success': True,
-            'message': f'导入完成：共 {len(words)} 个词，成功导入 {inserted_count} 个新词',
-            'total': len(words),
+            'message': f'导入完成：共 {total_words} 个词，成功导入 {inserted_count} 个新词',
+            'total': total_words,
             'inserted': inserted_count,
-            'skipped': len(words) - inserted_count
+            'skipped': total_words - inserted_count
         })
 
     except Exception as e:
@@ -662,26 +753,30 @@ def api_import_stopwords():
 def api_reset_stopwords():
     """API: 恢复默认停用词"""
     try:
-        from models.database import bootstrap_stopwords
-        from services.text_mining_service import TextMiningService
-
         conn = get_db()
         cur = conn.cursor()
 
-        # Delete all stopwords
-        cur.execute("DELETE FROM stopwords")
-        conn.commit()
-
-        # Re-initialize default stopwords
-        bootstrap_stopwords()
+        # 清空与重建在同一事务内：重建失败时回滚，不会留下空表
+        # （不用 TRUNCATE：它会隐式提交，且需要 DROP 权限）
+        try:
+            # Delete all stopwords
+            cur.execute("DELETE FROM stopwords")
+
+            # Re-initialize default stopwords on the same connection, then commit once
+            bootstrap_stopwords(conn)
+            cur.execute("SELECT COUNT(*) AS cnt FROM stopwords")
+            count = cur.fetchone()['cnt']
+            # 写入失败时 bootstrap_stopwords 只记录日志，表为空即视为失败并回滚
+            if not count:
+                raise RuntimeError('默认停用词写入失败')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
         # Clear cache
         TextMiningService.clear_cache()
 
-        # Get new count
-        cur.execute("SELECT COUNT(*) AS cnt FROM stopwords")
-        count = cur.fetchone()['cnt']
-
         return jsonify({
             'success': True,
             'message': f'已恢复默认停用词，共 {count} 个'
@@ -699,27 +794,9 @@ def api_reset_stopwords():
 def api_stopwords_stats():
     """API: 获取停用词统计"""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        # Get counts by category
-        cur.execute("""
-            SELECT category, COUNT(*) as count
-            FROM stopwords
-            GROUP BY category
-        """)
-        rows = cur.fetchall()
-
-        stats = {row['category']: row['count'] for row in rows}
-        total = sum(stats.values())
-
         return jsonify({
             'success': True,
-            'stats': {
-                'total': total,
-                'builtin': stats.get('builtin', 0),
-                'custom': stats.get('custom', 0)
-            }
+            'stats': TextMiningService.get_category_stats()
         })
 
     except Exception as e:
@@ -745,12 +822,7 @@ def ai_config_page():
 def api_get_ai_templates():
     """API: 获取AI提供商模板列表"""
     try:
-        from services.ai_config_service import AIConfigService
-        templates = AIConfigService.get_provider_templates()
-        return jsonify({
-            'success': True,
-            'templates': templates
-        })
+        return current_app.response_class(_ai_templates_body(), mimetype='application/json')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -763,9 +835,8 @@ def api_get_ai_templates():
 def api_get_ai_providers():
     """API: 获取所有AI提供商配置"""
     try:
-        from services.ai_config_service import AIConfigService
         providers = AIConfigService.get_all_providers()
-        return jsonify({
+        return _conditional_json({
             'success': True,
             'providers': providers
         })
@@ -781,7 +852,6 @@ def api_get_ai_providers():
 def api_get_ai_provider(provider_id):
     """API: 获取单个AI提供商配置"""
     try:
-        from services.ai_config_service import AIConfigService
         provider = AIConfigService.get_provider_by_id(provider_id)
         if not provider:
             return jsonify({
@@ -805,8 +875,6 @@ def api_get_ai_provider(provider_id):
 def api_add_ai_provider():
     """API: 添加AI提供商"""
     try:
-        from services.ai_config_service import AIConfigService
-
         data = request.get_json()
         success, message, provider_id = AIConfigService.add_provider(data)
 
@@ -834,8 +902,6 @@ def api_add_ai_provider():
 def api_update_ai_provider(provider_id):
     """API: 更新AI提供商配置"""
     try:
-        from services.ai_config_service import AIConfigService
-
         data = request.get_json()
         success, message = AIConfigService.update_provider(provider_id, data)
 
@@ -862,8 +928,6 @@ def api_update_ai_provider(provider_id):
 def api_delete_ai_provider(provider_id):
     """API: 删除AI提供商"""
     try:
-        from services.ai_config_service import AIConfigService
-
         success, message = AIConfigService.delete_provider(provider_id)
 
         if success:
@@ -889,8 +953,6 @@ def api_delete_ai_provider(provider_id):
 def api_set_default_ai_provider(provider_id):
     """API: 设置默认AI提供商"""
     try:
-        from services.ai_config_service import AIConfigService
-
         success, message = AIConfigService.set_default_provider(provider_id)
 
         if success:
@@ -916,8 +978,6 @@ def api_set_default_ai_provider(provider_id):
 def api_toggle_ai_provider(provider_id):
     """API: 切换AI提供商激活状态"""
     try:
-        from services.ai_config_service import AIConfigService
-
         success, message, is_active = AIConfigService.toggle_provider_active(provider_id)
 
         if success:
@@ -944,8 +1004,6 @@ def api_toggle_ai_provider(provider_id):
 def api_test_ai_provider(provider_id):
     """API: 测试AI提供商连接"""
     try:
-        from services.ai_config_service import AIConfigService
-
         success, message, result = AIConfigService.test_provider(provider_id)
 
         return jsonify({
@@ -961,17 +1019,34 @@ def api_test_ai_provider(provider_id):
         }), 500
 
 
+@system_config_bp.route('/api/ai/providers/test-all', methods=['POST'])
+@admin_required
+def api_test_all_ai_providers():
+    """API: 并发测试所有已启用的AI提供商"""
+    try:
+        results = AIConfigService.test_all_providers()
+
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'测试失败: {str(e)}'
+        }), 500
+
+
 @system_config_bp.route('/api/ai/stats', methods=['GET'])
 @admin_required
 def api_get_ai_stats():
     """API: 获取AI使用统计"""
     try:
-        from services.ai_config_service import AIConfigService
-
         days = request.args.get('days', 30, type=int)
         stats = AIConfigService.get_usage_stats(days)
 
-        return jsonify({
+        return _conditional_json({
             'success': True,
             'stats': stats
         })
@@ -988,11 +1063,21 @@ def api_get_ai_stats():
 def api_get_ai_logs():
     """API: 获取AI使用日志"""
     try:
-        from services.ai_config_service import AIConfigService
-
-        page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
 
+        # 游标分页：传 cursor（可为空串表示第一页）时不统计总数
+        if 'cursor' in request.args:
+            before_id = request.args.get('cursor', type=int)
+            logs, next_cursor = AIConfigService.get_usage_logs_before(before_id, per_page)
+            return jsonify({
+                'success': True,
+                'logs': logs,
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
+
+        page = request.args.get('page', 1, type=int)
         logs, total = AIConfigService.get_usage_logs(page, per_page)
 
         return jsonify({
@@ -1027,7 +1112,6 @@ def ai_prompts_page():
 def api_get_ai_prompts():
     """API: 获取所有AI提示语配置"""
     try:
-        from services.ai_prompt_config_service import AIPromptConfigService
         configs = AIPromptConfigService.get_all_configs()
         return jsonify({
             'success': True,
@@ -1045,7 +1129,6 @@ def api_get_ai_prompts():
 def api_get_ai_prompt(config_key):
     """API: 获取单个AI提示语配置"""
     try:
-        from services.ai_prompt_config_service import AIPromptConfigService
         config = AIPromptConfigService.get_config_by_key(config_key)
         if not config:
             return jsonify({
@@ -1069,17 +1152,23 @@ def api_get_ai_prompt(config_key):
 def api_update_ai_prompt(config_key):
     """API: 更新AI提示语配置"""
     try:
-        from services.ai_prompt_config_service import AIPromptConfigService
+        # 读取请求体前先按 Content-Length 拒绝超大提交
+        if (request.content_length or 0) > AI_PROMPT_MAX_BYTES:
+            return jsonify({
+                'success': False,
+                'error': '指令内容过长'
+            }), 413
 
-        data = request.get_json()
-        new_instruction = data.get('instruction', '').strip()
+        data = request.get_json(silent=True) or {}
+        new_instruction = data.get('instruction')
 
-        if not new_instruction:
+        if not isinstance(new_instruction, str):
             return jsonify({
                 'success': False,
                 'error': '指令内容不能为空'
             }), 400
 
+        # 去空白与空值校验由 update_config 统一完成
         success, message = AIPromptConfigService.update_config(config_key, new_instruction)
 
         if success:
@@ -1105,8 +1194,6 @@ def api_update_ai_prompt(config_key):
 def api_reset_ai_prompt(config_key):
     """API: 重置单个AI提示语配置为默认值"""
     try:
-        from services.ai_prompt_config_service import AIPromptConfigService
-
         success, message = AIPromptConfigService.reset_config(config_key)
 
         if success:
@@ -1132,8 +1219,6 @@ def api_reset_ai_prompt(config_key):
 def api_reset_all_ai_prompts():
     """API: 重置所有AI提示语配置为默认值"""
     try:
-        from services.ai_prompt_config_service import AIPromptConfigService
-
         success, message = AIPromptConfigService.reset_all_configs()
 
         if success:
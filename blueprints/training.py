@@ -7,6 +7,7 @@
 import os
 import re
 from datetime import datetime
+from itertools import chain
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app
 from openpyxl import Workbook, load_workbook
@@ -18,7 +19,7 @@ from config.settings import (
 )
 
 from config.settings import APP_TITLE, EXPORT_DIR
-from models.database import get_db
+from models.database import get_db, DatabaseManager
 from .decorators import login_required, role_required, top_level_manager_required, admin_required
 from .helpers import require_user_id, get_accessible_department_ids, validate_employee_access, build_department_filter, parse_time_range, build_date_filter_sql, log_import_operation
 from utils.training_utils import normalize_project_name
@@ -1013,9 +1014,6 @@ def export():
     category_filter = request.args.get("category", "").strip()
     problem_type_filter = request.args.get("problem_type", "").strip()
 
-    conn = get_db()
-    cur = conn.cursor()
-
     # 使用新的部门过滤机制
     where_clause, join_clause, dept_params = build_department_filter('tr')
 
@@ -1052,24 +1050,24 @@ def export():
 
     base_query += " ORDER BY tr.training_date DESC"
 
-    cur.execute(base_query, tuple(params))
-    rows = cur.fetchall()
+    # 导出可能涉及大量记录：流式读取并写入 write_only 工作簿，避免整表驻留内存
+    rows = DatabaseManager.execute_stream(base_query, tuple(params))
+    first_row = next(rows, None)
 
-    if not rows:
+    if first_row is None:
         flash("无数据可导出", "warning")
         return redirect(url_for("training.records"))
 
     filename_date = datetime.now().strftime("%Y%m%d_%H%M%S")
     xlsx_path = os.path.join(EXPORT_DIR, f"培训记录_{filename_date}.xlsx")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "培训记录"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("培训记录")
 
     headers = ["工号", "姓名", "班组", "培训日期", "项目类别", "问题类型", "具体问题", "整改措施", "用时", "得分", "鉴定人员", "备注", "是否合格"]
     ws.append(headers)
 
-    for row in rows:
+    for row in chain((first_row,), rows):
         ws.append([
             row["emp_no"], row["name"], row["team_name"] or "",
             row["training_date"], row["category_name"] or "",
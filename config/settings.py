@@ -6,6 +6,8 @@ Separated from main app for better maintainability
 """
 import os
 from datetime import timedelta
+from functools import lru_cache
+from types import MappingProxyType
 
 # Base configuration
 BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
@@ -64,6 +66,23 @@ class DatabaseConfig:
     MYSQL_DATABASE = os.environ.get("MYSQL_DATABASE", "team_management")
     MYSQL_CHARSET = os.environ.get("MYSQL_CHARSET", "utf8mb4")
 
+    # Driver: auto (prefer mysqlclient, fall back to pymysql) / mysqlclient / pymysql
+    DRIVER = os.environ.get("DB_DRIVER", "auto").lower()
+
+    # Connection pool (opt-in, requires DBUtils)
+    USE_POOL = os.environ.get("MYSQL_USE_POOL", "false").lower() in ("1", "true", "yes")
+    POOL_MIN_CACHED = int(os.environ.get("MYSQL_POOL_MIN_CACHED", "5"))
+    POOL_MAX_CACHED = int(os.environ.get("MYSQL_POOL_MAX_CACHED", "10"))
+    POOL_MAX_CONNECTIONS = int(os.environ.get("MYSQL_POOL_MAX_CONNECTIONS", "50"))
+
+# Security/Database settings exported to the Flask config (collected once at import)
+_SECURITY_SETTINGS = tuple(
+    (key, value) for key, value in vars(SecurityConfig).items() if not key.startswith('_')
+)
+_DATABASE_SETTINGS = tuple(
+    (key, value) for key, value in vars(DatabaseConfig).items() if not key.startswith('_')
+)
+
 # Application environment
 class Config:
     """Base configuration class"""
@@ -74,14 +93,12 @@ class Config:
         self.DINGTALK_CORP_ID = DINGTALK_CORP_ID
 
         # Security settings
-        for key, value in vars(SecurityConfig).items():
-            if not key.startswith('_'):
-                setattr(self, key, value)
+        for key, value in _SECURITY_SETTINGS:
+            setattr(self, key, value)
 
         # Database settings
-        for key, value in vars(DatabaseConfig).items():
-            if not key.startswith('_'):
-                setattr(self, key, value)
+        for key, value in _DATABASE_SETTINGS:
+            setattr(self, key, value)
 
 class DevelopmentConfig(Config):
     """Development environment configuration"""
@@ -112,19 +129,24 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SESSION_COOKIE_SECURE = False
 
-# Configuration selection
-config = {
+# Configuration selection (read-only)
+config = MappingProxyType({
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
-}
+})
 
 def get_config(config_name=None):
     """Get configuration class based on environment"""
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'default')
 
+    return _build_config(config_name)
+
+@lru_cache(maxsize=4)
+def _build_config(config_name):
+    """Instantiate the configuration once per environment name"""
     return config.get(config_name, config['default'])()
 
 
@@ -152,11 +174,8 @@ class AIConfig:
         "deepseek": "https://api.deepseek.com/v1"
     }
 
-    @classmethod
-    @property
-    def BASE_URL(cls) -> str:
-        """Get base URL for current provider"""
-        return os.environ.get("AI_BASE_URL", cls.BASE_URLS.get(cls.PROVIDER, cls.BASE_URLS["openrouter"]))
+    # Base URL for current provider (resolved once at import, like the settings above)
+    BASE_URL = os.environ.get("AI_BASE_URL", BASE_URLS.get(PROVIDER, BASE_URLS["openrouter"]))
 
     # Request timeout in seconds
     TIMEOUT = float(os.environ.get("AI_TIMEOUT", "30"))
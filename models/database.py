@@ -5,34 +5,168 @@ Database connection and management module
 MySQL backend only
 """
 import os
-import pymysql
-from pymysql.cursors import DictCursor
-from threading import local
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from threading import local, Lock, Thread
 import logging
 from config.settings import DatabaseConfig
 
+logger = logging.getLogger(__name__)
+
+# 数据库驱动：优先 mysqlclient（C 扩展解码结果行），不可用时回退纯 Python 的 pymysql。
+# 两者均为 DB-API 2.0、%s 占位符，异常类与游标类同名，调用方统一经 db_driver 引用
+db_driver = None
+if DatabaseConfig.DRIVER in ("auto", "mysqlclient"):
+    try:
+        import MySQLdb as db_driver
+        from MySQLdb.constants import CLIENT
+        from MySQLdb.cursors import Cursor, DictCursor, SSDictCursor
+    except ImportError:
+        if DatabaseConfig.DRIVER == "mysqlclient":
+            raise
+        db_driver = None
+if db_driver is None:
+    import pymysql as db_driver
+    from pymysql.constants import CLIENT
+    from pymysql.cursors import Cursor, DictCursor, SSDictCursor
+DB_DRIVER_NAME = "mysqlclient" if db_driver.__name__ == "MySQLdb" else "pymysql"
+
+try:
+    from dbutils.pooled_db import PooledDB
+    POOL_AVAILABLE = True
+except ImportError:
+    PooledDB = None
+    POOL_AVAILABLE = False
+
 # Thread-local storage for database connections
 _local = local()
 
+# 进程级连接池（DatabaseConfig.USE_POOL 开启时按需创建）
+_pool = None
+_pool_lock = Lock()
+
+
+def _connect_kwargs():
+    """数据库连接参数（mysqlclient 与 pymysql 通用）"""
+    return dict(
+        host=DatabaseConfig.MYSQL_HOST,
+        port=DatabaseConfig.MYSQL_PORT,
+        user=DatabaseConfig.MYSQL_USER,
+        password=DatabaseConfig.MYSQL_PASSWORD,
+        database=DatabaseConfig.MYSQL_DATABASE,
+        charset=DatabaseConfig.MYSQL_CHARSET,
+        cursorclass=DictCursor,
+        autocommit=False
+    )
+
+
+# TCP keepalive：空闲 60 秒后开始探测，防止长连接被 NAT/防火墙静默回收
+TCP_KEEPIDLE_SECONDS = 60
+
+
+def _create_connection(**kwargs):
+    """创建数据库连接；pymysql 连接额外开启 TCP keepalive（pymysql 已默认设置 TCP_NODELAY）
+
+    mysqlclient 的套接字由 libmysqlclient 管理，不暴露给 Python，保持驱动默认设置。
+    """
+    conn = db_driver.connect(**kwargs)
+    sock = getattr(conn, '_sock', None)
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, TCP_KEEPIDLE_SECONDS)
+        except OSError as e:
+            logger.warning("设置 TCP keepalive 失败: %s", e)
+    return conn
+
+
+# DBUtils 通过 creator.dbapi 识别线程安全级别与异常类型
+_create_connection.dbapi = db_driver
+
+
+def _get_pool():
+    """获取进程级连接池；未启用或 DBUtils 未安装时返回 None"""
+    global _pool
+    if not DatabaseConfig.USE_POOL:
+        return None
+    if not POOL_AVAILABLE:
+        logger.warning("MYSQL_USE_POOL 已开启但未安装 DBUtils，回退为直连")
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PooledDB(
+                    creator=_create_connection,
+                    mincached=DatabaseConfig.POOL_MIN_CACHED,
+                    maxcached=DatabaseConfig.POOL_MAX_CACHED,
+                    maxconnections=DatabaseConfig.POOL_MAX_CONNECTIONS,
+                    blocking=True,
+                    ping=1,  # 取出连接时检测可用性
+                    **_connect_kwargs()
+                )
+    return _pool
+
+
+# 线程持有的连接空闲超过该秒数后，再次取用前先 ping 一次（失效则重建）
+IDLE_PING_SECONDS = 60
+
 
 def get_db():
     """Get MySQL database connection"""
+    now = time.monotonic()
+    conn = getattr(_local, 'connection', None)
+    if conn is not None and now - getattr(_local, 'last_used', now) > IDLE_PING_SECONDS:
+        # 长驻线程（后台任务等）的连接可能已被服务端 wait_timeout 或网络设备断开
+        try:
+            conn.ping()
+        except Exception as e:
+            logger.info("空闲连接已失效，重新建立: %s", e)
+            close_db()
+    _local.last_used = now
+
     if not hasattr(_local, 'connection') or _local.connection is None:
-        _local.connection = pymysql.connect(
-            host=DatabaseConfig.MYSQL_HOST,
-            port=DatabaseConfig.MYSQL_PORT,
-            user=DatabaseConfig.MYSQL_USER,
-            password=DatabaseConfig.MYSQL_PASSWORD,
-            database=DatabaseConfig.MYSQL_DATABASE,
-            charset=DatabaseConfig.MYSQL_CHARSET,
-            cursorclass=DictCursor,
-            autocommit=False
-        )
+        pool = _get_pool()
+        if pool is not None:
+            # 归还时由连接池 rollback 未提交事务
+            conn = pool.connection()
+        else:
+            conn = _create_connection(**_connect_kwargs())
+        _local.connection = conn
     return _local.connection
 
 
+def get_cursor():
+    """当前线程连接上复用的 DictCursor（随 close_db 一并关闭）
+
+    仅供 DatabaseManager 这类一次取完结果的辅助方法使用；需要同时持有
+    多个结果集的调用方仍应自行 conn.cursor()。
+    """
+    conn = get_db()
+    cur = getattr(_local, 'cursor', None)
+    if cur is None:
+        cur = _local.cursor = conn.cursor()
+    return cur
+
+
+def connect_multi_statement():
+    """独立的多语句连接（仅用于批量 DDL 脚本，用完即关，不进入 thread-local/连接池）"""
+    return db_driver.connect(client_flag=CLIENT.MULTI_STATEMENTS, **_connect_kwargs())
+
+
 def close_db():
-    """Close database connection"""
+    """Close database connection (pooled connections are returned to the pool)"""
+    cur = getattr(_local, 'cursor', None)
+    if cur is not None:
+        try:
+            cur.close()
+        except Exception:
+            pass
+        finally:
+            _local.cursor = None
     if hasattr(_local, 'connection') and _local.connection:
         try:
             _local.connection.close()
@@ -42,16 +176,44 @@ def close_db():
             _local.connection = None
 
 
+# fork 后子进程继承的连接/连接池：与父进程共用套接字，不能在子进程中使用或关闭
+# （关闭会发送 COM_QUIT 断开父进程的会话），仅保留引用防止被回收时触发关闭
+_inherited_after_fork = []
+
+
+def _reset_after_fork():
+    """子进程中丢弃从父进程继承的数据库状态（如 gunicorn --preload 的 worker）"""
+    global _pool, _pool_lock
+    _inherited_after_fork.append((dict(_local.__dict__), _pool))
+    _local.__dict__.clear()
+    _pool = None
+    _pool_lock = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# year/month 拼接为 'YYYY-MM' 的 SQL 表达式，可直接在 SQL 构造处引用
+YEAR_MONTH_CONCAT = "CONCAT(year, '-', LPAD(month, 2, '0'))"
+
+
 def get_year_month_concat():
     """
     Get SQL expression for concatenating year and month into 'YYYY-MM' format.
     Returns the SQL expression string to use in queries.
     """
-    return "CONCAT(year, '-', LPAD(month, 2, '0'))"
+    return YEAR_MONTH_CONCAT
 
 
-def init_database():
-    """Initialize database with all tables and indexes using Version Manager"""
+def init_database(force=False, defer_indexes=False):
+    """Initialize database with all tables and indexes using Version Manager
+
+    Args:
+        force: 忽略结构签名，强制完整检查表/视图/索引
+        defer_indexes: 报表类复合索引（DEFERRED_INDEXES）改由后台线程创建，
+            不阻塞启动；仅用于常驻进程，CLI/脚本应保持默认同步创建
+    """
     conn = get_db()
     cur = conn.cursor()
 
@@ -59,93 +221,240 @@ def init_database():
         # Use the new Database Management System
         from models.db_mgmt import DBVersionManager
         manager = DBVersionManager(cur)
-        manager.initialize()
+        manager.initialize(force=force, defer_indexes=defer_indexes)
 
         # 提交所有更改（主要是版本信息等 DML 操作）
         conn.commit()
-        logging.info("数据库初始化变更已提交")
+        logger.info("数据库初始化变更已提交")
+
+        if defer_indexes:
+            # 每次启动都在后台补建：上次后台任务被中断时结构签名仍会跳过同步初始化
+            Thread(target=_create_deferred_indexes, name="deferred-indexes", daemon=True).start()
         return conn
 
     except Exception as e:
-        logging.error("数据库初始化失败: %s", e)
+        logger.error("数据库初始化失败: %s", e)
         conn.rollback()
         raise  # 重新抛出，让应用层处理
 
 
-def _create_indexes(cur):
-    """Create performance indexes for MySQL"""
-    indexes = [
-        ("idx_departments_path", "departments", "path"),
-        ("idx_departments_parent_id", "departments", "parent_id"),
-        ("idx_users_department_id", "users", "department_id"),
-        ("idx_users_role", "users", "role"),
-        ("idx_users_username", "users", "username"),
-        ("idx_employees_dept_id", "employees", "department_id"),
-        ("idx_employees_emp_no", "employees", "emp_no"),
-        ("idx_perf_year_month", "performance_records", "year, month"),
-        ("idx_perf_emp_no", "performance_records", "emp_no"),
-        ("idx_training_records_created_by", "training_records", "created_by"),
-        ("idx_training_records_emp_no", "training_records", "emp_no"),
-        ("idx_training_records_date", "training_records", "training_date"),
-        ("idx_training_records_disqualified", "training_records", "is_disqualified"),
-        ("idx_safety_inspection_created_by", "safety_inspection_records", "created_by"),
-        ("idx_safety_inspection_date", "safety_inspection_records", "inspection_date"),
-        ("idx_safety_inspection_category", "safety_inspection_records", "category"),
-        ("idx_safety_inspection_team", "safety_inspection_records", "responsible_team"),
-        ("idx_stopwords_word", "stopwords", "word"),
-        ("idx_stopwords_category", "stopwords", "category"),
-        ("idx_ai_providers_active", "ai_providers", "is_active"),
-        ("idx_ai_providers_default", "ai_providers", "is_default"),
-        ("idx_ai_usage_logs_provider", "ai_usage_logs", "provider_id"),
-        ("idx_ai_usage_logs_created", "ai_usage_logs", "created_at"),
-        ("idx_ai_analysis_history_emp_hash", "ai_analysis_history", "emp_no, data_hash"),
-        ("idx_ai_analysis_history_created", "ai_analysis_history", "created_at"),
-        ("idx_import_logs_module", "import_logs", "module"),
-        ("idx_import_logs_user_id", "import_logs", "user_id"),
-        ("idx_import_logs_created_at", "import_logs", "created_at"),
-        ("idx_import_logs_department_id", "import_logs", "department_id"),
-        ("idx_config_logs_changed_at", "algorithm_config_logs", "changed_at"),
-        ("idx_training_projects_category_id", "training_projects", "category_id"),
-        ("idx_training_projects_archived", "training_projects", "is_archived"),
-        ("idx_training_records_project_snapshot", "training_records", "project_name_snapshot"),
-        # 性能优化复合索引
-        ("idx_training_emp_date_composite", "training_records", "emp_no, training_date"),
-        ("idx_safety_person_date_composite", "safety_inspection_records", "inspected_person, inspection_date"),
-        ("idx_performance_emp_year_month", "performance_records", "emp_no, year, month"),
-    ]
-
-    for index_name, table_name, columns in indexes:
+# 性能索引定义：(索引名, 表名, 列[, 索引类型])
+PERFORMANCE_INDEXES = (
+    ("idx_departments_path", "departments", "path"),
+    ("idx_departments_parent_id", "departments", "parent_id"),
+    ("idx_users_department_id", "users", "department_id"),
+    ("idx_users_role", "users", "role"),
+    ("idx_employees_dept_id", "employees", "department_id"),
+    ("idx_perf_year_month", "performance_records", "year, month"),
+    ("idx_training_records_created_by", "training_records", "created_by"),
+    ("idx_training_records_emp_no", "training_records", "emp_no"),
+    ("idx_training_records_date", "training_records", "training_date"),
+    ("idx_training_records_disqualified", "training_records", "is_disqualified"),
+    ("idx_safety_inspection_created_by", "safety_inspection_records", "created_by"),
+    ("idx_safety_inspection_date", "safety_inspection_records", "inspection_date"),
+    ("idx_safety_inspection_category", "safety_inspection_records", "category"),
+    ("idx_safety_inspection_team", "safety_inspection_records", "responsible_team"),
+    # 覆盖停用词列表 ORDER BY category DESC, id DESC 的排序，避免 filesort
+    ("idx_stopwords_category_id", "stopwords", "category, id"),
+    ("idx_ai_providers_active", "ai_providers", "is_active"),
+    ("idx_ai_providers_default", "ai_providers", "is_default"),
+    ("idx_ai_usage_logs_provider", "ai_usage_logs", "provider_id"),
+    ("idx_ai_usage_logs_created", "ai_usage_logs", "created_at"),
+    ("idx_ai_analysis_history_created", "ai_analysis_history", "created_at"),
+    ("idx_import_logs_module", "import_logs", "module"),
+    ("idx_import_logs_user_id", "import_logs", "user_id"),
+    ("idx_import_logs_created_at", "import_logs", "created_at"),
+    ("idx_import_logs_department_id", "import_logs", "department_id"),
+    ("idx_config_logs_changed_at", "algorithm_config_logs", "changed_at"),
+    ("idx_training_projects_category_id", "training_projects", "category_id"),
+    ("idx_training_projects_archived", "training_projects", "is_archived"),
+    ("idx_training_records_project_snapshot", "training_records", "project_name_snapshot"),
+    # 全文索引（ngram 分词，支持中文关键词检索）
+    ("ft_stopwords_word", "stopwords", "word", "FULLTEXT"),
+)
+
+# 报表类复合索引：在已有数据的大表上建索引耗时长，可延后到后台创建（格式同上）
+DEFERRED_INDEXES = (
+    ("idx_training_emp_date_composite", "training_records", "emp_no, training_date"),
+    ("idx_safety_person_date_composite", "safety_inspection_records", "inspected_person, inspection_date"),
+)
+
+
+def _create_indexes(cur, indexes=PERFORMANCE_INDEXES):
+    """Create performance indexes for MySQL
+
+    Returns:
+        list: 创建失败的索引名（单个失败只记录日志，不中断其余索引）
+    """
+    # 一次查询取回当前库全部索引的列顺序，替代逐个 SHOW INDEX 探测
+    cur.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, INDEX_TYPE, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    existing = {}
+    for row in cur.fetchall():
+        key = (row['TABLE_NAME'], row['INDEX_NAME'])
+        # 函数索引（MySQL 8 functional key part）的 COLUMN_NAME 为 NULL
+        existing.setdefault(key, (row['INDEX_TYPE'], []))[1].append((row['COLUMN_NAME'] or '').lower())
+
+    def _is_covered(table_name, columns, index_type):
+        """同表已有同类索引以这些列为最左前缀（含主键/唯一键）时无需再建"""
+        wanted = [c.strip().lower() for c in columns.split(",")]
+        for (table, _), (existing_type, existing_cols) in existing.items():
+            if (table == table_name and existing_type == index_type and
+                    existing_cols[:len(wanted)] == wanted):
+                return True
+        return False
+
+    # 先在本地规划缺失索引，按表分组
+    pending = {}
+    for index_name, table_name, columns, *kind in indexes:
+        index_type = kind[0] if kind else "BTREE"
+        if ((table_name, index_name) in existing or
+                _is_covered(table_name, columns, index_type)):
+            continue
+        pending.setdefault(table_name, []).append((index_name, columns, index_type))
+        existing[(table_name, index_name)] = (
+            index_type, [c.strip().lower() for c in columns.split(",")]
+        )
+
+    if len(pending) <= 1:
+        return [name for table_name, table_indexes in pending.items()
+                for name in _apply_table_indexes(cur, table_name, table_indexes)]
+
+    # 多表并行建索引：每个工作线程使用独立连接。
+    # 先结束当前事务释放元数据锁，避免与工作线程的 DDL 互相等待
+    cur.connection.commit()
+    with ThreadPoolExecutor(max_workers=min(INDEX_DDL_WORKERS, len(pending))) as executor:
+        return [name for failed in executor.map(_apply_table_indexes_isolated, pending.items())
+                for name in failed]
+
+
+# 并行建索引的最大线程数
+INDEX_DDL_WORKERS = 8
+
+
+def _create_deferred_indexes():
+    """后台线程入口：在独立连接上补建 DEFERRED_INDEXES（在线 DDL，不阻塞读写）"""
+    try:
+        conn = db_driver.connect(**_connect_kwargs())
+    except Exception as e:
+        logger.warning("延后索引创建连接失败: %s", e)
+        return
+    try:
+        with conn.cursor() as cur:
+            failed = _create_indexes(cur, DEFERRED_INDEXES)
+        if failed:
+            logger.warning("延后索引未全部创建: %s", ", ".join(failed))
+        else:
+            logger.info("延后索引检查完成")
+    except Exception as e:
+        logger.warning("延后索引创建失败: %s", e)
+    finally:
+        conn.close()
+
+
+def _apply_table_indexes_isolated(item):
+    """在独立连接上为单表建索引（供线程池调用），返回创建失败的索引名"""
+    table_name, table_indexes = item
+    try:
+        conn = db_driver.connect(**_connect_kwargs())
+    except Exception as e:
+        logger.warning("索引创建连接失败 %s: %s", table_name, e)
+        return [name for name, _, _ in table_indexes]
+    try:
+        with conn.cursor() as cur:
+            return _apply_table_indexes(cur, table_name, table_indexes)
+    finally:
+        conn.close()
+
+
+# 服务端不支持所请求的在线 DDL 算法/锁级别（ER_ALTER_OPERATION_NOT_SUPPORTED[_REASON]）
+_ONLINE_DDL_UNSUPPORTED = (1845, 1846)
+
+
+def create_index_online(cur, table_name, index_name, columns, unique=False):
+    """在线创建索引（ALGORITHM=INPLACE, LOCK=NONE，不阻塞并发写入）
+
+    服务端不支持在线方式时（旧版本 MySQL 或特定列类型）回退为普通 CREATE INDEX。
+    """
+    sql = f"CREATE {'UNIQUE ' if unique else ''}INDEX {index_name} ON {table_name}({columns})"
+    try:
+        cur.execute(f"{sql} ALGORITHM=INPLACE LOCK=NONE")
+    except db_driver.MySQLError as e:
+        if not e.args or e.args[0] not in _ONLINE_DDL_UNSUPPORTED:
+            raise
+        logger.warning("索引 %s.%s 不支持在线创建，改用普通方式: %s", table_name, index_name, e)
+        cur.execute(sql)
+
+
+def _apply_table_indexes(cur, table_name, table_indexes):
+    """为单表创建缺失索引：普通索引合并为一条在线 ALTER TABLE（只扫描一次表）
+
+    Returns:
+        list: 创建失败的索引名
+    """
+    failed = []
+    btree = [(name, cols) for name, cols, index_type in table_indexes if index_type != "FULLTEXT"]
+    fulltext = [(name, cols) for name, cols, index_type in table_indexes if index_type == "FULLTEXT"]
+
+    if btree:
+        adds = ", ".join(f"ADD INDEX {name} ({cols})" for name, cols in btree)
         try:
-            cur.execute(f"SHOW INDEX FROM {table_name} WHERE Key_name = %s", (index_name,))
-            if cur.fetchone() is None:
-                cur.execute(f"CREATE INDEX {index_name} ON {table_name}({columns})")
+            # 在线建索引：不阻塞并发读写
+            cur.execute(f"ALTER TABLE {table_name} {adds}, ALGORITHM=INPLACE, LOCK=NONE")
         except Exception as e:
-            logging.warning("索引创建失败 %s.%s: %s", table_name, index_name, e)
+            # 合并语句失败时逐个重试，单个索引失败不影响其余索引
+            logger.warning("批量索引创建失败 %s，改为逐个创建: %s", table_name, e)
+            for name, cols in btree:
+                try:
+                    create_index_online(cur, table_name, name, cols)
+                except Exception as e:
+                    logger.warning("索引创建失败 %s.%s: %s", table_name, name, e)
+                    failed.append(name)
+
+    # 全文索引不支持 LOCK=NONE，单独创建
+    for name, cols in fulltext:
+        try:
+            cur.execute(f"CREATE FULLTEXT INDEX {name} ON {table_name}({cols}) WITH PARSER ngram")
+        except Exception as e:
+            logger.warning("索引创建失败 %s.%s: %s", table_name, name, e)
+            failed.append(name)
+    return failed
+
+
+def _existing_seeds(cur):
+    """一次往返探测各种子表是否已有数据（EXISTS 命中首行即返回，无需 COUNT 全表）"""
+    cur.execute("""
+        SELECT
+            EXISTS(SELECT 1 FROM departments) AS departments,
+            EXISTS(SELECT 1 FROM users) AS users,
+            EXISTS(SELECT 1 FROM stopwords) AS stopwords,
+            EXISTS(SELECT 1 FROM ai_analysis_config) AS ai_analysis_config
+    """)
+    return {table: bool(flag) for table, flag in cur.fetchone().items()}
 
 
 def bootstrap_data():
-    """Bootstrap initial data if database is empty"""
+    """Bootstrap initial data if database is empty
+
+    所有默认数据在同一事务内写入，最后统一提交一次。
+    """
     conn = get_db()
     cur = conn.cursor()
+    seeded = _existing_seeds(cur)
 
     # Bootstrap default department
-    cur.execute("SELECT COUNT(1) AS cnt FROM departments")
-    result = cur.fetchone()
-    count = result['cnt'] if result else 0
-
-    if count == 0:
+    if not seeded['departments']:
         cur.execute(
             "INSERT INTO departments(name, description, level, path) VALUES(%s, %s, %s, %s)",
             ("总公司", "顶级部门", 1, "/1")
         )
-        conn.commit()
 
     # Bootstrap admin account
-    cur.execute("SELECT COUNT(1) AS cnt FROM users")
-    result = cur.fetchone()
-    count = result['cnt'] if result else 0
-
-    if count == 0:
+    if not seeded['users']:
         from werkzeug.security import generate_password_hash
 
         bootstrap_user = os.environ.get("APP_USER", "admin").strip()
@@ -155,153 +464,185 @@ def bootstrap_data():
             "INSERT INTO users(username, password_hash, department_id, role) VALUES(%s, %s, %s, %s)",
             (bootstrap_user, generate_password_hash(bootstrap_pass), 1, "admin"),
         )
-        conn.commit()
 
+    # 停用词/AI 配置写入失败时只记录日志，不影响其余默认数据提交
+    # （MySQL 中单条语句失败不会中止整个事务）
     # Bootstrap default stopwords
-    bootstrap_stopwords()
+    if not seeded['stopwords']:
+        bootstrap_stopwords(conn, seeded=False)
 
     # Bootstrap default AI analysis configs
-    bootstrap_ai_analysis_config()
-
+    if not seeded['ai_analysis_config']:
+        bootstrap_ai_analysis_config(conn, seeded=False)
 
-def bootstrap_ai_analysis_config():
-    """Initialize default AI analysis configurations"""
-    conn = get_db()
-    cur = conn.cursor()
+    conn.commit()
 
-    # Check if configs already exist
-    cur.execute("SELECT COUNT(1) AS cnt FROM ai_analysis_config")
-    result = cur.fetchone()
-    count = result['cnt'] if result else 0
 
-    if count > 0:
-        return  # Already initialized
-
-    # Default configs (copied from AIPromptConfigService to avoid circular import)
-    default_configs = [
-        {
-            "key": "risk_profile",
-            "title": "1. 关键风险画像",
-            "instruction": """1. 高频违章点：指出出现频率最高的前3个问题类型。
+# Default configs (copied from AIPromptConfigService to avoid circular import)
+_DEFAULT_AI_ANALYSIS_CONFIGS = (
+    {
+        "key": "risk_profile",
+        "title": "1. 关键风险画像",
+        "instruction": """1. 高频违章点：指出出现频率最高的前3个问题类型。
 2. 严重违章点：提取所有考核分值 > 3分（或双倍扣分）的严重问题。
 3. 时空规律：分析这些问题是否集中在特定时间（如早晚班）或特定作业环节（如出入库、正线折返）。"""
-        },
-        {
-            "key": "training_gap",
-            "title": "2. 培训关联分析",
-            "instruction": """1. 结合"培训失格"和"培训具体问题"记录，分析他的**实操弱项**是否直接导致了上述违章？
+    },
+    {
+        "key": "training_gap",
+        "title": "2. 培训关联分析",
+        "instruction": """1. 结合"培训失格"和"培训具体问题"记录，分析他的**实操弱项**是否直接导致了上述违章？
 2. (例如：培训中多次"车门故障"不合格，现场是否也发生了车门操作违章？)"""
-        },
-        {
-            "key": "root_cause",
-            "title": "3. 根因深度定性",
-            "instruction": """请判断该员工的主要风险来源是以下哪一种，并给出理由：
+    },
+    {
+        "key": "root_cause",
+        "title": "3. 根因深度定性",
+        "instruction": """请判断该员工的主要风险来源是以下哪一种，并给出理由：
 A. **技能型短板** (Skill Deficit): 业务生疏，不知道怎么做。
 B. **习惯性违章** (Habitual Violation): 知道标准，但为了省事简化作业。
 C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波动导致。"""
-        },
-        {
-            "key": "prediction",
-            "title": "4. 预测性预警",
-            "instruction": """基于现有趋势，如果不仅行干预，预测该员工在未来 30 天内最可能发生的**具体安全事故**是什么？（如：冒进信号、夹人夹物等）。"""
-        },
-        {
-            "key": "measures",
-            "title": "5. 精准帮扶方案",
-            "instruction": """针对上述原因，给出具体的帮扶措施（不要给万金油建议）。
+    },
+    {
+        "key": "prediction",
+        "title": "4. 预测性预警",
+        "instruction": """基于现有趋势，如果不仅行干预，预测该员工在未来 30 天内最可能发生的**具体安全事故**是什么？（如：冒进信号、夹人夹物等）。"""
+    },
+    {
+        "key": "measures",
+        "title": "5. 精准帮扶方案",
+        "instruction": """针对上述原因，给出具体的帮扶措施（不要给万金油建议）。
 - **技能型**：建议重修哪一门具体课程？
 - **习惯型**：建议采取何种检查手段（如：加密视频抽查频次、跟车添乘）？"""
-        }
-    ]
+    }
+)
+_BOOTSTRAP_AI_ANALYSIS_SQL = (
+    "INSERT INTO ai_analysis_config (config_key, title, default_instruction, current_instruction) VALUES "
+    + ",".join(["(%s, %s, %s, %s)"] * len(_DEFAULT_AI_ANALYSIS_CONFIGS))
+)
+_BOOTSTRAP_AI_ANALYSIS_PARAMS = tuple(
+    v for c in _DEFAULT_AI_ANALYSIS_CONFIGS
+    for v in (c['key'], c['title'], c['instruction'], c['instruction'])
+)
+
+
+def bootstrap_ai_analysis_config(conn=None, seeded=None):
+    """Initialize default AI analysis configurations
+
+    Args:
+        conn: 复用调用方的连接；传入时由调用方统一提交事务
+        seeded: 调用方已探测到的"表中是否已有数据"；为 None 时自行检查
+    """
+    owns_transaction = conn is None
+    if conn is None:
+        conn = get_db()
+    cur = conn.cursor()
+
+    # Check if configs already exist
+    if seeded is None:
+        cur.execute("SELECT EXISTS(SELECT 1 FROM ai_analysis_config) AS seeded")
+        seeded = bool(cur.fetchone()['seeded'])
+    if seeded:
+        return  # Already initialized
 
     try:
-        cur.executemany(
-            """
-            INSERT INTO ai_analysis_config (config_key, title, default_instruction, current_instruction)
-            VALUES (%s, %s, %s, %s)
-            """,
-            [(c['key'], c['title'], c['instruction'], c['instruction']) for c in default_configs]
-        )
-        conn.commit()
-        logging.info("AI 分析配置初始化完成: %d 条", len(default_configs))
+        cur.execute(_BOOTSTRAP_AI_ANALYSIS_SQL, _BOOTSTRAP_AI_ANALYSIS_PARAMS)
+        if owns_transaction:
+            conn.commit()
+        logger.info("AI 分析配置初始化完成: %d 条", len(_DEFAULT_AI_ANALYSIS_CONFIGS))
     except Exception as e:
-        logging.warning("AI 分析配置初始化失败: %s", e)
-
-
-def bootstrap_stopwords():
-    """Initialize default stopwords for NLP text mining"""
-    conn = get_db()
+        logger.warning("AI 分析配置初始化失败: %s", e)
+
+
+# Default Chinese stopwords for text mining
+_DEFAULT_STOPWORD_LIST = [
+    # 常用虚词
+    "的", "了", "和", "是", "就", "都", "而", "及", "与", "着",
+    "或", "一个", "没有", "我们", "你们", "他们", "它们", "这个", "那个", "这些",
+    "那些", "之", "于", "以", "为", "其", "等", "但", "并", "把",
+    "被", "比", "这", "那", "如", "你", "我", "他", "她", "它",
+    # 标点符号
+    "，", "。", "！", "？", "；", "：", "\"", "\"", "'", "'",
+    "（", "）", "【", "】", "、", "…", "—", "《", "》",
+    # 数字
+    "一", "二", "三", "四", "五", "六", "七", "八", "九", "十",
+    "百", "千", "万", "亿", "第", "次", "个", "年", "月", "日",
+    # 常用动词（在安全/培训记录中高频但无意义）
+    "进行", "开展", "发现", "存在", "要求", "需要", "应该", "可以", "能够", "已经",
+    "正在", "开始", "结束", "完成", "实施", "执行", "检查", "整改", "处理", "落实",
+    # 常用名词（在记录中高频但无分析价值）
+    "情况", "问题", "工作", "人员", "单位", "部门", "现场", "区域", "位置", "时间",
+    "过程", "内容", "方面", "方式", "措施", "要求", "标准", "规定", "制度", "管理",
+    # 业务高频弱语义词（通用叙述但价值较低）
+    "员工", "岗位", "班组", "班次", "当班", "本次", "本月", "本季度", "本年度", "当日",
+    "当天", "本部门", "本班组", "有关", "相关", "关于", "对于", "针对", "通过", "根据",
+    "按照", "涉及", "以及", "及其", "无法", "未能", "尚未", "必须", "及时", "严格",
+    "进一步", "加强", "确保", "提高", "提升", "安排", "组织", "负责", "负责人员",
+    "记录", "登记", "统计", "汇总", "报表", "报告", "反馈", "通知",
+    # 流程/交互类高频词（描述性强但区分度弱）
+    "司机", "确认", "询问", "回答", "是否", "有无", "申请", "汇报", "报行调", "行调",
+    "报行", "报单", "填写", "签名", "点击", "建立", "一次", "分钟", "一分钟", "再次",
+    "重新", "车站", "站台", "列车",
+    # 人名/地名（样本中频繁出现，非风险特征）
+    "贾河", "宇航", "南四环", "朝阳", "刘庄", "五里", "庄上",
+    "周子捷", "刘力", "鹏飞", "张强", "志强", "杨成", "陈洋", "罗柏豪", "王绍华", "王永超",
+    "张浩", "潘思宇", "李闯", "赵顺", "庞永辉", "郭逸", "李志轩", "张舒阳", "张建营",
+    "彭哲", "冯恩", "陈书毫", "胡双印", "李家",
+    # 连接词
+    "因为", "所以", "但是", "而且", "或者", "如果", "虽然", "不过", "然而", "因此",
+    "此外", "另外", "同时", "首先", "其次", "最后", "总之", "即", "也", "还",
+    # 程度副词
+    "很", "非常", "特别", "十分", "相当", "比较", "稍微", "略", "更", "最",
+    "太", "极", "过于", "尤其", "格外", "分外", "越", "越来越", "愈", "愈加",
+    # 时间词
+    "今天", "明天", "昨天", "现在", "当前", "目前", "近期", "最近", "以前", "以后",
+    "之前", "之后", "期间", "当时", "随后", "立即", "马上", "即刻", "暂时", "临时",
+    # 指示代词
+    "这里", "那里", "这边", "那边", "这样", "那样", "如此", "怎样", "怎么", "什么",
+    "哪里", "哪个", "哪些", "谁", "多少", "几", "某", "某些", "各", "每",
+    # 助词
+    "吗", "呢", "吧", "啊", "呀", "哦", "哪", "啥", "嘛", "罢了",
+    "而已", "罢", "矣", "焉", "耳", "乎", "兮", "也罢", "也好", "便是"
+]
+
+# 去重并保持顺序，预编译为一条多 VALUES 的 INSERT（一次解析、一次往返）
+DEFAULT_STOPWORDS = tuple(dict.fromkeys(_DEFAULT_STOPWORD_LIST))
+_BOOTSTRAP_STOPWORDS_SQL = (
+    "INSERT IGNORE INTO stopwords (word, category) VALUES "
+    + ",".join(["(%s, 'builtin')"] * len(DEFAULT_STOPWORDS))
+)
+
+
+def bootstrap_stopwords(conn=None, seeded=None):
+    """Initialize default stopwords for NLP text mining
+
+    Args:
+        conn: 复用调用方的连接；传入时由调用方统一提交事务
+        seeded: 调用方已探测到的"表中是否已有数据"；为 None 时自行检查
+    """
+    owns_transaction = conn is None
+    if conn is None:
+        conn = get_db()
     cur = conn.cursor()
 
     # Check if stopwords already exist
-    cur.execute("SELECT COUNT(1) AS cnt FROM stopwords")
-    result = cur.fetchone()
-    count = result['cnt'] if result else 0
-
-    if count > 0:
+    if seeded is None:
+        cur.execute("SELECT EXISTS(SELECT 1 FROM stopwords) AS seeded")
+        seeded = bool(cur.fetchone()['seeded'])
+    if seeded:
         return  # Already initialized
 
-    # Default Chinese stopwords for text mining
-    default_stopwords = [
-        # 常用虚词
-        "的", "了", "和", "是", "就", "都", "而", "及", "与", "着",
-        "或", "一个", "没有", "我们", "你们", "他们", "它们", "这个", "那个", "这些",
-        "那些", "之", "于", "以", "为", "其", "等", "但", "并", "把",
-        "被", "比", "这", "那", "如", "你", "我", "他", "她", "它",
-        # 标点符号
-        "，", "。", "！", "？", "；", "：", "\"", "\"", "'", "'",
-        "（", "）", "【", "】", "、", "…", "—", "《", "》",
-        # 数字
-        "一", "二", "三", "四", "五", "六", "七", "八", "九", "十",
-        "百", "千", "万", "亿", "第", "次", "个", "年", "月", "日",
-        # 常用动词（在安全/培训记录中高频但无意义）
-        "进行", "开展", "发现", "存在", "要求", "需要", "应该", "可以", "能够", "已经",
-        "正在", "开始", "结束", "完成", "实施", "执行", "检查", "整改", "处理", "落实",
-        # 常用名词（在记录中高频但无分析价值）
-        "情况", "问题", "工作", "人员", "单位", "部门", "现场", "区域", "位置", "时间",
-        "过程", "内容", "方面", "方式", "措施", "要求", "标准", "规定", "制度", "管理",
-        # 业务高频弱语义词（通用叙述但价值较低）
-        "员工", "岗位", "班组", "班次", "当班", "本次", "本月", "本季度", "本年度", "当日",
-        "当天", "本部门", "本班组", "有关", "相关", "关于", "对于", "针对", "通过", "根据",
-        "按照", "涉及", "以及", "及其", "无法", "未能", "尚未", "必须", "及时", "严格",
-        "进一步", "加强", "确保", "提高", "提升", "安排", "组织", "负责", "负责人员",
-        "记录", "登记", "统计", "汇总", "报表", "报告", "反馈", "通知",
-        # 流程/交互类高频词（描述性强但区分度弱）
-        "司机", "确认", "询问", "回答", "是否", "有无", "申请", "汇报", "报行调", "行调",
-        "报行", "报单", "填写", "签名", "点击", "建立", "一次", "分钟", "一分钟", "再次",
-        "重新", "车站", "站台", "列车",
-        # 人名/地名（样本中频繁出现，非风险特征）
-        "贾河", "宇航", "南四环", "朝阳", "刘庄", "五里", "庄上",
-        "周子捷", "刘力", "鹏飞", "张强", "志强", "杨成", "陈洋", "罗柏豪", "王绍华", "王永超",
-        "张浩", "潘思宇", "李闯", "赵顺", "庞永辉", "郭逸", "李志轩", "张舒阳", "张建营",
-        "彭哲", "冯恩", "陈书毫", "胡双印", "李家",
-        # 连接词
-        "因为", "所以", "但是", "而且", "或者", "如果", "虽然", "不过", "然而", "因此",
-        "此外", "另外", "同时", "首先", "其次", "最后", "总之", "即", "也", "还",
-        # 程度副词
-        "很", "非常", "特别", "十分", "相当", "比较", "稍微", "略", "更", "最",
-        "太", "极", "过于", "尤其", "格外", "分外", "越", "越来越", "愈", "愈加",
-        # 时间词
-        "今天", "明天", "昨天", "现在", "当前", "目前", "近期", "最近", "以前", "以后",
-        "之前", "之后", "期间", "当时", "随后", "立即", "马上", "即刻", "暂时", "临时",
-        # 指示代词
-        "这里", "那里", "这边", "那边", "这样", "那样", "如此", "怎样", "怎么", "什么",
-        "哪里", "哪个", "哪些", "谁", "多少", "几", "某", "某些", "各", "每",
-        # 助词
-        "吗", "呢", "吧", "啊", "呀", "哦", "哪", "啥", "嘛", "罢了",
-        "而已", "罢", "矣", "焉", "耳", "乎", "兮", "也罢", "也好", "便是"
-    ]
-
     # Insert default stopwords
     try:
-        cur.executemany(
-            "INSERT IGNORE INTO stopwords (word, category) VALUES (%s, 'builtin')",
-            [(word,) for word in default_stopwords]
-        )
-        conn.commit()
-        logging.info("停用词初始化完成: %d 个", len(default_stopwords))
+        cur.execute(_BOOTSTRAP_STOPWORDS_SQL, DEFAULT_STOPWORDS)
+        if owns_transaction:
+            conn.commit()
+        logger.info("停用词初始化完成: %d 个", len(DEFAULT_STOPWORDS))
     except Exception as e:
-        logging.warning("停用词初始化失败: %s", e)
+        logger.warning("停用词初始化失败: %s", e)
+
+
+def _in_transaction_scope():
+    """当前线程是否处于 DatabaseManager.transaction_scope 内"""
+    return getattr(_local, 'tx_depth', 0) > 0
 
 
 class DatabaseManager:
@@ -311,8 +652,9 @@ class DatabaseManager:
     def execute_query(query, params=None, fetch=False):
         """Execute a query with optional parameters"""
         conn = get_db()
-        cur = conn.cursor()
+        cur = get_cursor()
 
+        in_scope = _in_transaction_scope()
         try:
             if params:
                 cur.execute(query, params)
@@ -322,38 +664,86 @@ class DatabaseManager:
             if fetch:
                 return cur.fetchall()
             else:
-                conn.commit()
+                # transaction_scope 内由最外层统一提交/回滚
+                if not in_scope:
+                    conn.commit()
                 return cur.rowcount
 
         except Exception as e:
-            conn.rollback()
+            if not in_scope:
+                conn.rollback()
             raise e
 
     @staticmethod
     def execute_many(query, params_list):
         """Execute a query with multiple parameter sets"""
         conn = get_db()
-        cur = conn.cursor()
+        cur = get_cursor()
 
+        in_scope = _in_transaction_scope()
         try:
             cur.executemany(query, params_list)
-            conn.commit()
+            if not in_scope:
+                conn.commit()
             return cur.rowcount
 
         except Exception as e:
-            conn.rollback()
+            if not in_scope:
+                conn.rollback()
             raise e
 
     @staticmethod
-    def transaction(func):
-        """Decorator for database transactions"""
-        def wrapper(*args, **kwargs):
-            conn = get_db()
+    def execute_stream(query, params=None):
+        """流式执行查询，逐行产出结果（SSDictCursor，不在内存中缓冲整个结果集）
+
+        注意：迭代结束（或生成器被关闭）之前，当前线程的连接被该结果集占用，
+        期间不能在同一连接上执行其他查询。
+        """
+        conn = get_db()
+        cur = conn.cursor(SSDictCursor)
+        try:
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+        finally:
+            cur.close()
+
+    @staticmethod
+    @contextmanager
+    def transaction_scope():
+        """可嵌套的事务上下文：仅最外层提交/回滚，内层使用 SAVEPOINT
+
+        内层失败只回滚到自己的保存点，异常继续向外抛出，由调用方决定是否整体放弃。
+        """
+        conn = get_db()
+        depth = getattr(_local, 'tx_depth', 0)
+        savepoint = f"sp{depth}"
+        cur = conn.cursor()
+        try:
+            if depth:
+                cur.execute(f"SAVEPOINT {savepoint}")
+            _local.tx_depth = depth + 1
             try:
-                result = func(*args, **kwargs)
+                yield conn
+            except BaseException:
+                if depth:
+                    cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                else:
+                    conn.rollback()
+                raise
+            if depth:
+                cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+            else:
                 conn.commit()
-                return result
-            except Exception as e:
-                conn.rollback()
-                raise e
+        finally:
+            _local.tx_depth = depth
+            cur.close()
+
+    @staticmethod
+    def transaction(func):
+        """Decorator for database transactions (nested calls share the outermost commit)"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with DatabaseManager.transaction_scope():
+                return func(*args, **kwargs)
         return wrapper
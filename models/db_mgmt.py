@@ -3,28 +3,61 @@
 Database Management Module
 Handles initialization, version control, and migrations.
 """
-from models.database import get_db, _create_indexes
+import hashlib
+import logging
+
+from models.database import (
+    get_db, connect_multi_statement, create_index_online, _create_indexes,
+    PERFORMANCE_INDEXES, DEFERRED_INDEXES
+)
 from models.schema_defs import ALL_TABLES, VIEW_RECENT_IMPORTS
 
+logger = logging.getLogger(__name__)
+
 # Current Database Schema Version
 # Increment this when making schema changes
-CURRENT_DB_VERSION = 6
+CURRENT_DB_VERSION = 7
+
+# 结构签名：建表/视图/索引定义或版本号任一变化都会改变签名，无需手工维护
+SCHEMA_SIGNATURE = hashlib.sha1(
+    "\n".join([
+        str(CURRENT_DB_VERSION),
+        *ALL_TABLES,
+        VIEW_RECENT_IMPORTS,
+        repr(PERFORMANCE_INDEXES),
+        repr(DEFERRED_INDEXES),
+    ]).encode("utf-8")
+).hexdigest()
+
+# 全部建表语句合并为一个脚本（导入时拼接一次），一次往返执行；
+# 外键检查的关闭/恢复在同一脚本内，连接为独立会话，失败时直接关闭即可
+BASE_TABLES_SCRIPT = ";\n".join([
+    "SET FOREIGN_KEY_CHECKS = 0",
+    *(table_sql.strip() for table_sql in ALL_TABLES),
+    "SET FOREIGN_KEY_CHECKS = 1",
+])
 
 class DBVersionManager:
     def __init__(self, cursor=None):
         self.conn = get_db()
         self.cur = cursor if cursor else self.conn.cursor()
 
-    def initialize(self):
+    def initialize(self, force=False, defer_indexes=False):
         """
         Main entry point for DB initialization.
         Checks version, creates tables, runs migrations.
+        版本号与结构签名均为最新时直接跳过（force=True 强制完整检查）。
+        defer_indexes=True 时不在此处创建 DEFERRED_INDEXES，由调用方后台补建。
 
         注意: DDL 语句(CREATE/ALTER TABLE)在 MySQL 中会隐式提交，无法回滚。
         但版本信息更新等 DML 语句可以通过调用者的 commit/rollback 控制。
         """
         print("[-] Checking database status...")
 
+        if not force and self._is_schema_current():
+            print("[+] Schema signature matches, skipping initialization.")
+            return
+
         try:
             # 1. First, ensure base tables exist (idempotent)
             print("[-] Step 1/4: Ensuring base tables...")
@@ -38,53 +71,89 @@ class DBVersionManager:
 
             # 3. Create/Update Views
             print("[-] Step 3/4: Updating views...")
-            self._update_views()
-            print("[+] Views updated")
+            views_ok = self._update_views()
+            print("[+] Views updated" if views_ok else "[!] Views not updated")
 
             # 4. Ensure Indexes
             print("[-] Step 4/4: Ensuring indexes...")
-            self._ensure_indexes()
-            print("[+] Indexes ready")
+            failed_indexes = self._ensure_indexes(defer_indexes)
+            print("[+] Indexes ready" if not failed_indexes else "[!] Some indexes not created")
+
+            # 5. 记录结构签名，下次启动可直接跳过；
+            #    视图/索引有失败时不写签名，下次启动重新检查补建
+            if views_ok and not failed_indexes:
+                self._update_metadata('schema_signature', SCHEMA_SIGNATURE)
+            else:
+                logger.warning(
+                    "Schema signature not recorded, will retry on next startup "
+                    "(views ok: %s, failed indexes: %s)",
+                    views_ok, ", ".join(failed_indexes) or "none"
+                )
 
             print("[+] Database initialization complete successfully.")
 
         except Exception as e:
-            print(f"\n[!] Database initialization FAILED at step: {e}")
-            print(f"[!] Error details: {str(e)}")
-            print("[!] Rolling back transaction...")
+            logger.error("Database initialization FAILED, rolling back: %s", e)
             self.conn.rollback()
             raise  # 重新抛出异常，让调用者知道初始化失败
 
+    def _is_schema_current(self):
+        """版本号与结构签名均为最新时返回 True（一次查询）"""
+        try:
+            self.cur.execute(
+                "SELECT key_name, value FROM system_metadata "
+                "WHERE key_name IN ('db_version', 'schema_signature')"
+            )
+            meta = {row['key_name']: row['value'] for row in self.cur.fetchall()}
+            # 结束只读事务，释放元数据锁，避免阻塞随后独立连接上的 DDL
+            self.conn.commit()
+        except Exception:
+            # system_metadata 尚不存在（全新库），走完整初始化
+            self.conn.rollback()
+            return False
+        return (meta.get('db_version') == str(CURRENT_DB_VERSION) and
+                meta.get('schema_signature') == SCHEMA_SIGNATURE)
+
+    def _update_metadata(self, key_name, value):
+        """写入 system_metadata 键值"""
+        self.cur.execute(
+            "INSERT INTO system_metadata (key_name, value) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE value = %s",
+            (key_name, value, value)
+        )
+
     def _ensure_base_tables(self):
         """Runs the CREATE TABLE IF NOT EXISTS statements"""
-        # Disable foreign keys temporarily to avoid issues during table creation
-        self.cur.execute("SET FOREIGN_KEY_CHECKS = 0")
-
+        ddl_conn = connect_multi_statement()
         try:
-            for table_sql in ALL_TABLES:
-                try:
-                    self.cur.execute(table_sql)
-                except Exception as e:
-                    print(f"[!] Error ensuring table: {e}")
-                    print(f"[!] SQL: {table_sql[:100]}...")
-                    raise  # 抛出异常，表创建失败是致命错误
+            with ddl_conn.cursor() as cur:
+                cur.execute(BASE_TABLES_SCRIPT)
+                while cur.nextset():
+                    pass
+        except Exception as e:
+            logger.error("Error ensuring tables: %s", e)
+            raise  # 抛出异常，表创建失败是致命错误
         finally:
-            # 确保无论如何都恢复外键检查
-            self.cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+            ddl_conn.close()
 
     def _update_views(self):
-        """Re-creates views"""
+        """Re-creates views; returns False if any view failed"""
         try:
             self.cur.execute("DROP VIEW IF EXISTS v_recent_imports")
             self.cur.execute(VIEW_RECENT_IMPORTS)
             print("    + View v_recent_imports created/updated")
         except Exception as e:
-            print(f"[!] Warning: Could not update views: {e}")
+            logger.warning("Could not update views: %s", e)
             # 视图创建失败不是致命错误，记录警告但继续
+            return False
+        return True
 
-    def _ensure_indexes(self):
-        """Ensure performance indexes"""
-        _create_indexes(self.cur)
+    def _ensure_indexes(self, defer_indexes=False):
+        """Ensure performance indexes; returns the names of indexes that failed"""
+        failed = _create_indexes(self.cur)
+        if not defer_indexes:
+            failed += _create_indexes(self.cur, DEFERRED_INDEXES)
+        return failed
 
     def _check_and_migrate(self):
         """
@@ -112,7 +181,7 @@ class DBVersionManager:
         except Exception as e:
             # system_metadata 表应该在 _ensure_base_tables 中已创建
             # 如果这里出错，说明有严重问题
-            print(f"[!] Critical Error in version check: {e}")
+            logger.error("Critical error in version check: %s", e)
             raise  # 抛出异常而不是静默失败
 
         print(f"[*] Current DB Version: {db_version}, Target Version: {CURRENT_DB_VERSION}")
@@ -122,11 +191,7 @@ class DBVersionManager:
 
     def _update_version(self, version):
         """将数据库版本号更新到指定版本"""
-        self.cur.execute(
-            "INSERT INTO system_metadata (key_name, value) VALUES ('db_version', %s) "
-            "ON DUPLICATE KEY UPDATE value = %s",
-            (str(version), str(version))
-        )
+        self._update_metadata('db_version', str(version))
         print(f"[+] Database version updated to {version}")
 
     def _run_migrations(self, start_ver, target_ver):
@@ -171,6 +236,12 @@ class DBVersionManager:
             self._migration_v6_export_and_training_model()
             self._update_version(6)
 
+        # Migration from 6 -> 7 (Drop indexes covered by UNIQUE keys or composite indexes)
+        if start_ver < 7 and target_ver >= 7:
+            print("[-] Running Migration v7 (Redundant Index Cleanup)...")
+            self._migration_v7_drop_redundant_indexes()
+            self._update_version(7)
+
     def _migration_v1_baseline(self):
         """
         Baseline adjustments for v1 schema.
@@ -208,7 +279,7 @@ class DBVersionManager:
                 print(f"    + Adding column {table_name}.{column_name}")
                 self.cur.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_def}")
         except Exception as e:
-            print(f"[!] FATAL: Failed to ensure column {table_name}.{column_name}: {e}")
+            logger.error("FATAL: Failed to ensure column %s.%s: %s", table_name, column_name, e)
             raise  # 列新增失败是致命错误，不允许继续升级版本
 
     def _ensure_unique_index(self, table_name, index_name, columns):
@@ -217,9 +288,9 @@ class DBVersionManager:
             self.cur.execute(f"SHOW INDEX FROM {table_name} WHERE Key_name = %s", (index_name,))
             if self.cur.fetchone() is None:
                 print(f"    + Creating unique index {index_name} on {table_name}")
-                self.cur.execute(f"CREATE UNIQUE INDEX {index_name} ON {table_name}({columns})")
+                create_index_online(self.cur, table_name, index_name, columns, unique=True)
         except Exception as e:
-            print(f"[!] FATAL: Failed to ensure index {index_name} on {table_name}: {e}")
+            logger.error("FATAL: Failed to ensure index %s on %s: %s", index_name, table_name, e)
             raise  # 索引创建失败是致命错误，不允许继续升级版本
 
     def _ensure_index(self, table_name, index_name, columns):
@@ -228,11 +299,42 @@ class DBVersionManager:
             self.cur.execute(f"SHOW INDEX FROM {table_name} WHERE Key_name = %s", (index_name,))
             if self.cur.fetchone() is None:
                 print(f"    + Creating index {index_name} on {table_name}")
-                self.cur.execute(f"CREATE INDEX {index_name} ON {table_name}({columns})")
+                create_index_online(self.cur, table_name, index_name, columns)
         except Exception as e:
-            print(f"[!] FATAL: Failed to ensure index {index_name} on {table_name}: {e}")
+            logger.error("FATAL: Failed to ensure index %s on %s: %s", index_name, table_name, e)
             raise
 
+    def _drop_redundant_index(self, table_name, index_name, unique_only=True):
+        """删除冗余普通索引：仅当存在以相同列开头的其他 B-tree 索引时才删除
+
+        unique_only=True 时覆盖索引必须是唯一键（与唯一键列重复）；
+        False 时任一以其列为前缀的复合索引即可覆盖（单列索引被复合索引取代）。
+        """
+        self.cur.execute("""
+            SELECT INDEX_NAME, NON_UNIQUE, INDEX_TYPE,
+                   GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS cols
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            GROUP BY INDEX_NAME, NON_UNIQUE, INDEX_TYPE
+        """, (table_name,))
+        indexes = {row['INDEX_NAME']: row for row in self.cur.fetchall()}
+        target = indexes.get(index_name)
+        if target is None:
+            return
+        # 函数索引的 COLUMN_NAME 为 NULL，GROUP_CONCAT 可能整体为 NULL
+        prefix = (target['cols'] or '').lower()
+        if not prefix:
+            return
+        if not any(
+            name != index_name and row['INDEX_TYPE'] == 'BTREE' and
+            (not unique_only or not row['NON_UNIQUE']) and
+            ((row['cols'] or '').lower() + ',').startswith(prefix + ',')
+            for name, row in indexes.items()
+        ):
+            return
+        print(f"    - Dropping redundant index {index_name} on {table_name}")
+        self.cur.execute(f"ALTER TABLE {table_name} DROP INDEX {index_name}, ALGORITHM=INPLACE, LOCK=NONE")
+
     def _ensure_foreign_key(self, table_name, constraint_name, foreign_key, references, on_delete="CASCADE"):
         """确保外键约束存在"""
         try:
@@ -258,7 +360,7 @@ class DBVersionManager:
             else:
                 print(f"    - Foreign key {constraint_name} already exists")
         except Exception as e:
-            print(f"[!] Error ensuring foreign key {constraint_name}: {e}")
+            logger.warning("Error ensuring foreign key %s: %s", constraint_name, e)
             # 外键约束失败不是致命错误，记录但继续
 
     def _ensure_table(self, table_name, create_sql):
@@ -267,7 +369,7 @@ class DBVersionManager:
             self.cur.execute(create_sql)
             print(f"    + Table {table_name} ensured")
         except Exception as e:
-            print(f"[!] FATAL: Failed to ensure table {table_name}: {e}")
+            logger.error("FATAL: Failed to ensure table %s: %s", table_name, e)
             raise  # 建表失败是致命错误
 
     def _migration_v3_ppt_cache(self):
@@ -321,7 +423,7 @@ class DBVersionManager:
             """)
             print(f"      safety_inspection_records: {self.cur.rowcount} rows backfilled")
         except Exception as e:
-            print(f"    [!] Backfill warning: {e}")
+            logger.warning("Backfill warning: %s", e)
 
         # === 3. 日期字段结构化（Python 端逐行解析，避免 SQL 一刀切丢数据） ===
         date_migrations = [
@@ -403,7 +505,7 @@ class DBVersionManager:
                 self.cur.execute(f"ALTER TABLE {table} MODIFY COLUMN {field} DATE{not_null}")
                 print(f"    + {table}.{field}: VARCHAR → DATE (标准化 {cleaned}, 置NULL {nulled})")
             except Exception as e:
-                print(f"    [!] {table}.{field} migration failed: {e}")
+                logger.warning("%s.%s migration failed: %s", table, field, e)
 
     def _migration_v5_config_version(self):
         """P1.4 配置版本治理：algorithm_active_config / algorithm_config_logs 新增 config_version"""
@@ -424,7 +526,7 @@ class DBVersionManager:
             """)
             print(f"    + config_version 初始化完成 (affected={self.cur.rowcount})")
         except Exception as e:
-            print(f"    [!] config_version 初始化警告: {e}")
+            logger.warning("config_version 初始化警告: %s", e)
 
     def _migration_v6_export_and_training_model(self):
         """培训项目治理、PPT 模板与异步任务结构补齐"""
@@ -515,3 +617,17 @@ class DBVersionManager:
 
         # 异步任务表兜底
         self._ensure_column('async_tasks', 'meta_data', 'TEXT')
+
+    def _migration_v7_drop_redundant_indexes(self):
+        """
+        删除被唯一键或复合索引覆盖的普通索引：每次写入都要多维护一棵 B-tree，查询时也不会被优先选用
+        """
+        self._drop_redundant_index("users", "idx_users_username")
+        self._drop_redundant_index("stopwords", "idx_stopwords_word")
+        self._drop_redundant_index("ai_analysis_history", "idx_ai_analysis_history_emp_hash")
+        self._drop_redundant_index("employees", "idx_employees_emp_no")
+        self._drop_redundant_index("performance_records", "idx_perf_emp_no")
+        self._drop_redundant_index("performance_records", "idx_performance_emp_year_month")
+        # 单列 category 索引已被 (category, id) 复合索引取代：先补建复合索引，再删除前缀索引
+        self._ensure_index("stopwords", "idx_stopwords_category_id", "category, id")
+        self._drop_redundant_index("stopwords", "idx_stopwords_category", unique_only=False)
@@ -445,7 +445,7 @@ LIMIT 100
 """
 
 # List of all table creation statements in dependency order
-ALL_TABLES = [
+ALL_TABLES = (
     SYSTEM_METADATA_TABLE,
     DEPARTMENTS_TABLE,  # 先创建 departments，因为 users 依赖它
     USERS_TABLE,
@@ -471,5 +471,5 @@ ALL_TABLES = [
     ALGORITHM_CONFIG_LOGS_TABLE,
     ASYNC_TASKS_TABLE,
     PPT_EXPORT_CACHE_TABLE,
-    PPT_TEMPLATES_TABLE
-]
+    PPT_TEMPLATES_TABLE,
+)
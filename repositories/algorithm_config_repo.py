@@ -163,17 +163,25 @@ class AlgorithmConfigRepo:
 
     @staticmethod
     def get_logs(cur, limit: int = 50, offset: int = 0) -> list:
-        """获取配置变更日志列表"""
+        """获取配置变更日志列表（每行附带窗口计数 total，即总日志数）"""
         cur.execute("""
             SELECT
                 id, action, preset_name, change_reason,
-                changed_by, changed_by_name, changed_at, ip_address, config_version
+                changed_by, changed_by_name, changed_at, ip_address, config_version,
+                COUNT(*) OVER() AS total
             FROM algorithm_config_logs
             ORDER BY changed_at DESC
             LIMIT %s OFFSET %s
         """, (limit, offset))
         return cur.fetchall()
 
+    @staticmethod
+    def count_logs(cur) -> int:
+        """统计配置变更日志总数"""
+        cur.execute("SELECT COUNT(*) AS cnt FROM algorithm_config_logs")
+        row = cur.fetchone()
+        return row['cnt'] if row else 0
+
     @staticmethod
     def get_log_by_id(cur, log_id: int) -> Optional[dict]:
         """获取单条日志详情（含 old/new config）"""
@@ -2,16 +2,17 @@
 import os
 import sys
 import json
-import pymysql
 from datetime import datetime, date
-from collections import defaultdict
+from collections import Counter, defaultdict
 import importlib.util
 
+import numpy as np
+import pandas as pd
+
 # Add project root to path
 sys.path.append(os.getcwd())
 
-from models.database import get_db
-from config.settings import DatabaseConfig
+from models.database import get_db, close_db, DatabaseManager
 from blueprints.safety import extract_score_from_assessment
 from blueprints.personnel import (
     calculate_performance_score_monthly,
@@ -23,18 +24,6 @@ from blueprints.personnel import (
     # but I can simulate monthly which is easier.
 )
 
-# Mock Flask app and DB connection if needed, or just use pymysql directly
-def connect_db():
-    return pymysql.connect(
-        host=DatabaseConfig.MYSQL_HOST,
-        port=DatabaseConfig.MYSQL_PORT,
-        user=DatabaseConfig.MYSQL_USER,
-        password=DatabaseConfig.MYSQL_PASSWORD,
-        database=DatabaseConfig.MYSQL_DATABASE,
-        charset=DatabaseConfig.MYSQL_CHARSET,
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
 def load_config(conn):
     with conn.cursor() as cur:
         cur.execute("SELECT config_data FROM algorithm_active_config WHERE id = 1")
@@ -43,59 +32,82 @@ def load_config(conn):
             return json.loads(row['config_data'])
     return {}
 
+# GROUP_CONCAT 分隔符取 ASCII 记录分隔符，考核情况文本中不会出现
+SAFETY_CONCAT_SEPARATOR = '\x1e'
+SAFETY_CONCAT_MAX_LEN = 16 * 1024 * 1024
+
+# 安全分分布分段：<60 / 60-80 / 80-95 / 95-100（左闭右开）
+SCORE_BIN_EDGES = [60, 80, 95]
+SCORE_BIN_LABELS = ['<60', '60-80', '80-95', '95-100']
+
 def fetch_data(conn):
     start_date = '2025-01-01'
     end_date = '2025-11-30'
     
     data = {
         'employees': [],
-        'safety': [],
-        'training': [],
-        'performance': []
+        'safety': {},       # 姓名 -> 月份 -> [扣分值]（仅保留扣分 > 0 的记录）
+        'training': {},     # 工号 -> 月份 -> [培训记录]
+        'performance': {}   # 工号 -> 月份 -> (等级, 分数)
     }
     
     with conn.cursor() as cur:
         # Employees
         cur.execute("SELECT emp_no, name, entry_date, certification_date FROM employees")
         data['employees'] = cur.fetchall()
-        
-        # Safety (Jan-Nov)
-        cur.execute("""
-            SELECT inspected_person, inspection_date, assessment, category
+        # 安全明细按人/月在库内拼接，默认 1024 字节的上限会截断拼接结果
+        cur.execute("SET SESSION group_concat_max_len = %s", (SAFETY_CONCAT_MAX_LEN,))
+    
+    # 以下明细表行数大：服务端游标逐行读取，边读边按人/月归组，不在内存中保留整张结果集
+    # Safety (Jan-Nov)：库内 GROUP BY 人/月，每组只传回一行拼接后的考核情况
+    safety = defaultdict(dict)
+    for r in DatabaseManager.execute_stream(f"""
+            SELECT inspected_person,
+                   DATE_FORMAT(inspection_date, '%%Y-%%m') AS month,
+                   GROUP_CONCAT(assessment SEPARATOR '{SAFETY_CONCAT_SEPARATOR}') AS assessments
             FROM safety_inspection_records 
             WHERE inspection_date >= %s AND inspection_date <= %s
-        """, (start_date, end_date))
-        data['safety'] = cur.fetchall()
-        
-        # Training (Jan-Nov)
-        cur.execute("""
-            SELECT emp_no, training_date, score, is_qualified, is_disqualified
+              AND inspected_person IS NOT NULL AND inspected_person <> ''
+            GROUP BY inspected_person, month
+        """, (start_date, end_date)):
+        if not r['assessments']: continue
+        scores = [extract_score_from_assessment(a) for a in r['assessments'].split(SAFETY_CONCAT_SEPARATOR)]
+        scores = [v for v in scores if v > 0]
+        if scores:
+            safety[r['inspected_person']][r['month']] = scores
+    data['safety'] = safety
+    
+    # Training (Jan-Nov)
+    training = defaultdict(lambda: defaultdict(list))
+    for r in DatabaseManager.execute_stream("""
+            SELECT emp_no, training_date, score, is_qualified, is_disqualified,
+                   DATE_FORMAT(training_date, '%%Y-%%m') AS ym
             FROM training_records
             WHERE training_date >= %s AND training_date <= %s
-        """, (start_date, end_date))
-        data['training'] = cur.fetchall()
-        
-        # Performance (Jan-Nov)
-        cur.execute("""
+        """, (start_date, end_date)):
+        training[r['emp_no']][r['ym']].append(r)
+    data['training'] = training
+    
+    # Performance (Jan-Nov)
+    performance = defaultdict(dict)
+    for r in DatabaseManager.execute_stream("""
             SELECT emp_no, year, month, grade, score
             FROM performance_records
             WHERE year = 2025 AND month >= 1 AND month <= 11
-        """)
-        data['performance'] = cur.fetchall()
+        """):
+        g = r['grade'].upper() if r['grade'] else 'B+'
+        performance[r['emp_no']][f"{r['year']}-{r['month']:02d}"] = (g, r['score'])
+    data['performance'] = performance
         
     return data
 
 def analyze_safety(data, config):
     print("\n=== Safety Analysis (Jan-Nov 2025) ===")
-    records = data['safety']
-    
-    # Group by person
-    person_violations = defaultdict(list)
-    for r in records:
-        if not r['inspected_person']: continue
-        score_val = extract_score_from_assessment(r['assessment'])
-        if score_val > 0:
-            person_violations[r['inspected_person']].append(score_val)
+    # Group by person（fetch_data 已按人/月归组）
+    person_violations = {
+        person: [v for vs in month_vs.values() for v in vs]
+        for person, month_vs in data['safety'].items()
+    }
             
     # Calculate scores
     scores = []
@@ -138,26 +150,35 @@ def analyze_safety(data, config):
     print(f"People penalized for Severity (Score B < 100): {severity_penalties}")
     print(f"People with Critical Violations (>= {critical_threshold}): {critical_violations}")
     
-    # Distribution
-    dist = defaultdict(int)
-    for s in scores:
-        if s >= 95: dist['95-100'] += 1
-        elif s >= 80: dist['80-95'] += 1
-        elif s >= 60: dist['60-80'] += 1
-        else: dist['<60'] += 1
+    # Distribution：np.digitize 按 [60, 80, 95) 分段一次完成，各段计数用 bincount
+    arr = np.fromiter(scores, dtype=np.float64, count=len(scores))
+    counts = np.bincount(np.digitize(arr, SCORE_BIN_EDGES), minlength=len(SCORE_BIN_LABELS))
+    dist = {label: int(c) for label, c in zip(SCORE_BIN_LABELS, counts) if c}
         
     print("Score Distribution:")
     for k, v in sorted(dist.items()):
         print(f"  {k}: {v} ({v/total_people*100:.1f}%)")
 
+def _cert_years(cert_date):
+    """取证年限（按 2025-11-30 近似）；缺失或无法解析时按老员工 2 年处理"""
+    if not cert_date:
+        return 2.0
+    try:
+        # Simple approx
+        c_date = datetime.strptime(str(cert_date), '%Y-%m-%d')
+    except ValueError:
+        return 2.0
+    return (datetime(2025, 11, 30) - c_date).days / 365.0
+
 def analyze_training(data, config):
     print("\n=== Training Analysis (Jan-Nov 2025) ===")
-    records = data['training']
-    employees = {e['emp_no']: e for e in data['employees']}
+    # 取证年限每人只算一次，循环内直接查表
+    cert_years_map = {e['emp_no']: _cert_years(e['certification_date']) for e in data['employees']}
     
-    person_records = defaultdict(list)
-    for r in records:
-        person_records[r['emp_no']].append(r)
+    person_records = {
+        emp_no: [r for recs in month_recs.values() for r in recs]
+        for emp_no, month_recs in data['training'].items()
+    }
         
     scores = []
     penalized_count = 0
@@ -165,15 +186,7 @@ def analyze_training(data, config):
     afr_penalties = 0
     
     for emp_no, recs in person_records.items():
-        emp = employees.get(emp_no)
-        cert_years = 2.0 # Default experienced
-        if emp and emp['certification_date']:
-            try:
-                # Simple approx
-                c_date = datetime.strptime(str(emp['certification_date']), '%Y-%m-%d')
-                cert_years = (datetime(2025, 11, 30) - c_date).days / 365.0
-            except:
-                pass
+        cert_years = cert_years_map.get(emp_no, 2.0) # Default experienced
                 
         # Calculate
         res = calculate_training_score_with_penalty(recs, duration_days=334, cert_years=cert_years, config=config)
@@ -212,21 +225,22 @@ def analyze_training(data, config):
             afrs.append(afr)
             
     if afrs:
-        print(f"Max AFR detected: {max(afrs):.2f}")
-        print(f"Avg AFR (for those with fails): {sum(afrs)/len(afrs):.2f}")
+        afr_arr = np.asarray(afrs, dtype=np.float64)
+        print(f"Max AFR detected: {afr_arr.max():.2f}")
+        print(f"Avg AFR (for those with fails): {afr_arr.mean():.2f}")
 
 def analyze_performance(data, config):
     print("\n=== Performance Analysis (Jan-Nov 2025) ===")
-    records = data['performance']
-    
-    grade_counts = defaultdict(int)
-    total_records = len(records)
+    grade_counts = Counter()
+    total_records = 0
     
-    person_grades = defaultdict(list)
-    for r in records:
-        g = r['grade'].upper() if r['grade'] else 'B+'
-        grade_counts[g] += 1
-        person_grades[r['emp_no']].append(g)
+    # 每人只保留各等级计数（单次遍历），D/C 次数直接查表
+    person_grades = {}
+    for emp_no, month_recs in data['performance'].items():
+        grades = Counter(g for g, _ in month_recs.values())
+        person_grades[emp_no] = grades
+        grade_counts.update(grades)
+        total_records += len(month_recs)
         
     print(f"Total Performance Records: {total_records}")
     print("Grade Distribution:")
@@ -241,8 +255,8 @@ def analyze_performance(data, config):
     people_hit_c_limit = 0
     
     for emp_no, grades in person_grades.items():
-        d_count = grades.count('D')
-        c_count = grades.count('C')
+        d_count = grades['D']
+        c_count = grades['C']
         
         if d_count >= d_threshold:
             people_hit_d_limit += 1
@@ -260,80 +274,61 @@ def analyze_learning(data, config):
     
     weights = config['comprehensive']['score_weights']
     
-    # Build monthly cache
-    monthly_data = defaultdict(lambda: defaultdict(dict)) # emp -> month -> type -> score
+    # 各维度月度得分整理为长表：(工号, 月份, 维度, 分数)
+    rows = []
     
     # 1. Performance
-    for r in data['performance']:
-        m_str = f"{r['year']}-{r['month']:02d}"
-        monthly_data[r['emp_no']][m_str]['perf'] = float(r['score'] or 95)
+    for emp_no, month_recs in data['performance'].items():
+        for m_str, (_, score) in month_recs.items():
+            rows.append((emp_no, m_str, 'perf', float(score or 95)))
         
-    # 2. Safety (Monthly)
-    # This is harder, need to bin violations by month
-    violations_by_emp_month = defaultdict(lambda: defaultdict(list))
-    for r in data['safety']:
-        if not r['inspected_person']: continue
-        m_str = r['inspection_date'].strftime('%Y-%m') if hasattr(r['inspection_date'], 'strftime') else str(r['inspection_date'])[:7]
-        score_val = extract_score_from_assessment(r['assessment'])
-        if score_val > 0:
-            violations_by_emp_month[r['inspected_person']][m_str].append(score_val)
-            
-    for emp in monthly_data: # Iterate emps we know from performance (likely active)
-        # Use employee name mapping?
-        # Assuming for now name match or we use employees list to map emp_no <-> name
-        pass 
-    
+    # 2. Safety (Monthly)：fetch_data 已按人/月归组
     # Need name map
-    emp_map = {e['emp_no']: e['name'] for e in data['employees']}
     name_map = {e['name']: e['emp_no'] for e in data['employees']}
     
     # Fill Safety
-    for name, month_vs in violations_by_emp_month.items():
+    for name, month_vs in data['safety'].items():
         emp_no = name_map.get(name)
         if not emp_no: continue
         for m_str, vs in month_vs.items():
             res = calculate_safety_score_dual_track(vs, 1, config)
-            monthly_data[emp_no][m_str]['safety'] = res['final_score']
+            rows.append((emp_no, m_str, 'safety', res['final_score']))
             
     # Fill Training (Monthly)
-    # Similar binning
-    train_by_emp_month = defaultdict(lambda: defaultdict(list))
-    for r in data['training']:
-        m_str = r['training_date'].strftime('%Y-%m') if hasattr(r['training_date'], 'strftime') else str(r['training_date'])[:7]
-        train_by_emp_month[r['emp_no']][m_str].append(r)
-        
-    for emp_no, month_recs in train_by_emp_month.items():
+    for emp_no, month_recs in data['training'].items():
         for m_str, recs in month_recs.items():
             res = calculate_training_score_with_penalty(recs, duration_days=30, config=config)
-            monthly_data[emp_no][m_str]['train'] = res['radar_score']
-            
-    # Calculate Comp scores
-    comp_scores = defaultdict(dict)
-    months = [f"2025-{i:02d}" for i in range(1, 12)]
+            rows.append((emp_no, m_str, 'train', res['radar_score']))
     
-    for emp_no in monthly_data:
-        for m in months:
-            d = monthly_data[emp_no][m]
-            p = d.get('perf', 95.0) # Default B+
-            s = d.get('safety', 100.0)
-            t = d.get('train', 90.0) # Default training score? Or use accumulation?
+    if not rows:
+        print("No monthly records found.")
+        return
             
-            comp = p * weights['performance'] + s * weights['safety'] + t * weights['training']
-            comp_scores[emp_no][m] = comp
+    # Calculate Comp scores：长表转为 (工号, 月份) x 维度 的宽表，补齐 11 个月后整列加权
+    months = [f"2025-{i:02d}" for i in range(1, 12)]
+    long_df = pd.DataFrame(rows, columns=['emp_no', 'month', 'kind', 'score'])
+    long_df = long_df.drop_duplicates(['emp_no', 'month', 'kind'], keep='last')
+    grid = pd.MultiIndex.from_product([long_df['emp_no'].unique(), months], names=['emp_no', 'month'])
+    comp = (long_df.pivot(index=['emp_no', 'month'], columns='kind', values='score')
+            .reindex(index=grid, columns=['perf', 'safety', 'train'])
+            .astype(float)
+            # Default B+ / 无违规 / 默认培训分
+            .fillna({'perf': 95.0, 'safety': 100.0, 'train': 90.0}))
+    comp['score'] = (comp['perf'] * weights['performance'] +
+                     comp['safety'] * weights['safety'] +
+                     comp['train'] * weights['training'])
             
     # Now simulate Learning Ability (Month over Month)
+    comp['prev'] = comp.groupby(level='emp_no')['score'].shift()
+    transitions = comp.dropna(subset=['prev'])
+    
+    # 评级与 delta（已按算法取整）以 calculate_learning_ability_monthly 为准，逐个环比调用
     tiers = defaultdict(int)
     deltas = []
-    
-    for emp_no, m_scores in comp_scores.items():
-        sorted_months = sorted(m_scores.keys())
-        for i in range(1, len(sorted_months)):
-            curr = m_scores[sorted_months[i]]
-            prev = m_scores[sorted_months[i-1]]
-            
-            res = calculate_learning_ability_monthly(curr, prev)
-            tiers[res['tier']] += 1
-            deltas.append(res['delta'])
+    for curr, prev in zip(transitions['score'].tolist(), transitions['prev'].tolist()):
+        res = calculate_learning_ability_monthly(curr, prev)
+        tiers[res['tier']] += 1
+        deltas.append(res['delta'])
             
     total_months_calc = len(deltas)
     print(f"Total Monthly Transitions Calculated: {total_months_calc}")
@@ -343,9 +338,9 @@ def analyze_learning(data, config):
         
     print(f"Average Delta: {sum(deltas)/len(deltas):.2f}")
 
-
 def main():
-    conn = connect_db()
+    # 复用应用的 thread-local 连接（与其他脚本同一套连接参数）
+    conn = get_db()
     try:
         config = load_config(conn)
         print(f"Loaded Config based on preset: {config.get('based_on_preset', 'Unknown')}")
@@ -358,7 +353,7 @@ def main():
         analyze_learning(data, config)
         
     finally:
-        conn.close()
+        close_db()
 
 if __name__ == "__main__":
     main()
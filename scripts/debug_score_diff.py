@@ -32,7 +32,6 @@ def compare_scores(emp_no: str, start_date: str = None, end_date: str = None):
         calculate_stability_for_employee,
         calculate_stability_score_new,
         calculate_years_from_date,
-        get_year_month_concat,
         _resolve_stability_window,
         _month_range,
         _month_shift,
@@ -41,6 +40,7 @@ def compare_scores(emp_no: str, start_date: str = None, end_date: str = None):
         _build_monthly_safety_scores
     )
     from blueprints.safety import extract_score_from_assessment
+    from blueprints.helpers import month_range_to_dates
     from services.algorithm_config_service import AlgorithmConfigService
 
     algo_config = AlgorithmConfigService.get_active_config()
@@ -52,6 +52,9 @@ def compare_scores(emp_no: str, start_date: str = None, end_date: str = None):
         start_date = current_month
         end_date = current_month
 
+    # 月份区间换算为日期边界，直接比较日期列以便走索引
+    start_day, end_day = month_range_to_dates(start_date, end_date)
+
     conn = get_db()
     cur = conn.cursor()
 
@@ -80,32 +83,50 @@ def compare_scores(emp_no: str, start_date: str = None, end_date: str = None):
         SELECT score, is_qualified, is_disqualified, training_date
         FROM training_records WHERE emp_no = %s
     """
-    params = [emp_no]
+    training_params = [emp_no]
+    if start_day:
+        training_query += " AND training_date >= %s"
+        training_params.append(start_day)
+    if end_day:
+        training_query += " AND training_date <= %s"
+        training_params.append(end_day)
+
+    # 安全
+    safety_query = "SELECT assessment, inspection_date FROM safety_inspection_records WHERE inspected_person = %s"
+    safety_params = [emp_name]
+    if start_day:
+        safety_query += " AND inspection_date >= %s"
+        safety_params.append(start_day)
+    if end_day:
+        safety_query += " AND inspection_date <= %s"
+        safety_params.append(end_day)
+
+    # 绩效
+    is_monthly = (start_date == end_date) if start_date and end_date else True
+    perf_query = "SELECT score, grade, year, month FROM performance_records WHERE emp_no = %s"
+    perf_params = [emp_no]
     if start_date:
-        training_query += " AND DATE_FORMAT(training_date, '%%Y-%%m') >= %s"
-        params.append(start_date)
+        s_year, s_month = map(int, start_date.split('-'))
+        perf_query += " AND (year > %s OR (year = %s AND month >= %s))"
+        perf_params.extend([s_year, s_year, s_month])
     if end_date:
-        training_query += " AND DATE_FORMAT(training_date, '%%Y-%%m') <= %s"
-        params.append(end_date)
-    cur.execute(training_query, params)
+        e_year, e_month = map(int, end_date.split('-'))
+        perf_query += " AND (year < %s OR (year = %s AND month <= %s))"
+        perf_params.extend([e_year, e_year, e_month])
+    perf_query += " ORDER BY year, month"
+
+    # 均为按员工的索引点查，直接在当前连接上依次执行
+    cur.execute(training_query, training_params)
     training_records = cur.fetchall()
+    cur.execute(safety_query, safety_params)
+    safety_rows = cur.fetchall()
+    cur.execute(perf_query, perf_params)
+    perf_rows = cur.fetchall()
 
     duration_days = 30 if start_date == end_date else 180
     training_result1 = calculate_training_score_with_penalty(training_records, duration_days, cert_years, algo_config)
     training_score1 = training_result1['radar_score']
 
-    # 安全
-    safety_query = "SELECT assessment, inspection_date FROM safety_inspection_records WHERE inspected_person = %s"
-    params = [emp_name]
-    if start_date:
-        safety_query += " AND DATE_FORMAT(inspection_date, '%%Y-%%m') >= %s"
-        params.append(start_date)
-    if end_date:
-        safety_query += " AND DATE_FORMAT(inspection_date, '%%Y-%%m') <= %s"
-        params.append(end_date)
-    cur.execute(safety_query, params)
-    safety_rows = cur.fetchall()
-
     violations_list = [float(extract_score_from_assessment(r['assessment']))
                       for r in safety_rows if extract_score_from_assessment(r['assessment']) > 0]
     months_active = 1
@@ -113,15 +134,6 @@ def compare_scores(emp_no: str, start_date: str = None, end_date: str = None):
     safety_score1 = safety_result1['final_score']
 
     # 绩效
-    is_monthly = (start_date == end_date) if start_date and end_date else True
-    perf_query = f"""
-        SELECT score, grade, year, month FROM performance_records
-        WHERE emp_no = %s AND ({get_year_month_concat()}) >= %s AND ({get_year_month_concat()}) <= %s
-        ORDER BY year, month
-    """
-    cur.execute(perf_query, [emp_no, start_date, end_date])
-    perf_rows = cur.fetchall()
-
     if perf_rows:
         if is_monthly and len(perf_rows) == 1:
             perf_result1 = calculate_performance_score_monthly(
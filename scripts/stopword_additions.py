@@ -26,14 +26,12 @@ def main():
     conn = get_db()
     cur = conn.cursor()
 
-    inserted = 0
-    for word in ADDITIONAL_STOPWORDS:
-        cur.execute(
-            "INSERT IGNORE INTO stopwords (word, category) VALUES (%s, 'custom')",
-            (word,)
-        )
-        if cur.rowcount > 0:
-            inserted += 1
+    # INSERT IGNORE 跳过已存在的词，rowcount 即为实际新增数
+    cur.executemany(
+        "INSERT IGNORE INTO stopwords (word, category) VALUES (%s, 'custom')",
+        [(word,) for word in ADDITIONAL_STOPWORDS]
+    )
+    inserted = cur.rowcount
 
     conn.commit()
     TextMiningService.clear_cache()
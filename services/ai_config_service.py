@@ -6,6 +6,8 @@ AI Configuration Service
 参考 One-API 设计：https://github.com/songquanpeng/one-api
 """
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from models.database import get_db
@@ -205,6 +207,16 @@ PROVIDER_TEMPLATES = {
 class AIConfigService:
     """AI配置管理服务"""
 
+    # 连接测试成功结果缓存：{(provider_id, model): (timestamp, result)}
+    _test_cache: Dict[Tuple[int, str], Tuple[float, Dict]] = {}
+    TEST_CACHE_TTL = 60  # 秒
+    TEST_MAX_WORKERS = 8
+
+    # 使用日志总数缓存（日志只追加，允许短时间滞后）
+    _usage_total_cache: Optional[int] = None
+    _usage_total_time: float = 0
+    USAGE_TOTAL_TTL = 60  # 秒
+
     @classmethod
     def get_provider_templates(cls) -> Dict:
         """获取所有预置的提供商模板"""
@@ -262,30 +274,21 @@ class AIConfigService:
         try:
             conn = get_db()
             cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) AS cnt FROM ai_providers")
-            row = cur.fetchone()
-            return bool(row and row['cnt'] > 0)
+            cur.execute("SELECT EXISTS(SELECT 1 FROM ai_providers) AS has_any")
+            return bool(cur.fetchone()['has_any'])
         except Exception:
             return False
 
-    @classmethod
-    def get_provider_by_id(cls, provider_id: int) -> Optional[Dict]:
-        """根据ID获取提供商配置"""
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT id, name, provider_type, api_key, base_url, model,
-                   is_active, is_default, priority, timeout, max_tokens,
-                   temperature, extra_headers, description
-            FROM ai_providers
-            WHERE id = %s
-        """, (provider_id,))
-        row = cur.fetchone()
-
-        if not row:
-            return None
+    # get_provider_by_id / test_all_providers 共用的完整配置列
+    _PROVIDER_COLUMNS = """
+        id, name, provider_type, api_key, base_url, model,
+        is_active, is_default, priority, timeout, max_tokens,
+        temperature, extra_headers, description
+    """
 
+    @staticmethod
+    def _provider_from_row(row: Dict) -> Dict:
+        """将 ai_providers 行转换为完整配置字典（含 API Key，仅供内部调用）"""
         extra_headers = {}
         if row['extra_headers']:
             try:
@@ -310,6 +313,23 @@ class AIConfigService:
             'description': row['description']
         }
 
+    @classmethod
+    def get_provider_by_id(cls, provider_id: int) -> Optional[Dict]:
+        """根据ID获取提供商配置"""
+        conn = get_db()
+        cur = conn.cursor()
+
+        cur.execute(
+            f"SELECT {cls._PROVIDER_COLUMNS} FROM ai_providers WHERE id = %s",
+            (provider_id,)
+        )
+        row = cur.fetchone()
+
+        if not row:
+            return None
+
+        return cls._provider_from_row(row)
+
     @classmethod
     def get_default_provider(cls) -> Optional[Dict]:
         """获取默认的AI提供商（用于实际调用）"""
@@ -480,6 +500,7 @@ class AIConfigService:
                         params
                     )
 
+            cls._test_cache.clear()
             return True, '更新成功'
 
         except Exception as e:
@@ -500,6 +521,7 @@ class AIConfigService:
 
                 cur.execute("DELETE FROM ai_providers WHERE id = %s", (provider_id,))
 
+            cls._test_cache.clear()
             return True, f'已删除提供商: {row["name"]}'
 
         except Exception as e:
@@ -551,15 +573,12 @@ class AIConfigService:
             return False, f'操作失败: {str(e)}', False
 
     @classmethod
-    def test_provider(cls, provider_id: int) -> Tuple[bool, str, Optional[Dict]]:
-        """测试AI提供商连接"""
-        provider = cls.get_provider_by_id(provider_id)
-        if not provider:
-            return False, '提供商不存在', None
-
-        if not provider['api_key']:
-            return False, 'API Key未配置', None
+    def _probe_provider(cls, provider: Dict) -> Tuple[bool, str, Optional[Dict], Optional[int]]:
+        """发起一次测试调用（仅网络请求，不访问数据库，可在线程池中执行）
 
+        Returns:
+            (是否成功, 提示信息, 结果, 消耗 tokens)；tokens 为 None 表示未发起调用，不记日志
+        """
         try:
             from adapters.ai_client import chat
 
@@ -567,25 +586,99 @@ class AIConfigService:
                           max_tokens=50, temperature=0.1)
 
             if result.success:
-                cls.log_usage(provider_id, provider['name'], provider['model'],
-                              result.tokens_used, True, None, 'test')
                 return True, '连接成功', {
                     'reply': result.text,
                     'tokens': result.tokens_used,
                     'model': result.model
-                }
-            else:
-                cls.log_usage(provider_id, provider['name'], provider['model'],
-                              0, False, result.error, 'test')
-                return False, result.error, None
+                }, result.tokens_used
+            return False, result.error, None, 0
 
         except ImportError:
-            return False, 'httpx库未安装', None
+            return False, 'httpx库未安装', None, None
         except Exception as e:
-            error_msg = f'未知错误: {str(e)}'
-            cls.log_usage(provider_id, provider['name'], provider['model'],
-                          0, False, error_msg, 'test')
-            return False, error_msg, None
+            return False, f'未知错误: {str(e)}', None, 0
+
+    @classmethod
+    def _record_test(cls, provider: Dict, outcome: Tuple[bool, str, Optional[Dict], Optional[int]]) -> Tuple[bool, str, Optional[Dict]]:
+        """记录测试结果（使用日志 + 成功缓存），返回 (是否成功, 提示信息, 结果)"""
+        success, message, result, tokens = outcome
+        if tokens is None:
+            return success, message, result
+
+        cls.log_usage(provider['id'], provider['name'], provider['model'],
+                      tokens, success, None if success else message, 'test')
+        if success:
+            cls._test_cache[(provider['id'], provider['model'])] = (time.time(), result)
+        else:
+            cls._test_cache.pop((provider['id'], provider['model']), None)
+        return success, message, result
+
+    @classmethod
+    def _cached_test(cls, provider: Dict) -> Optional[Dict]:
+        """TTL 内的成功测试结果（仅用于 test_all_providers 批量测试去重）"""
+        cached = cls._test_cache.get((provider['id'], provider['model']))
+        if cached and time.time() - cached[0] < cls.TEST_CACHE_TTL:
+            return cached[1]
+        return None
+
+    @classmethod
+    def test_provider(cls, provider_id: int) -> Tuple[bool, str, Optional[Dict]]:
+        """测试AI提供商连接"""
+        provider = cls.get_provider_by_id(provider_id)
+        if not provider:
+            return False, '提供商不存在', None
+
+        if not provider['api_key']:
+            return False, 'API Key未配置', None
+
+        # 单个提供商的手动测试总是实际探测，不使用缓存结果（密钥失效/服务中断需立即反映）
+        return cls._record_test(provider, cls._probe_provider(provider))
+
+    @classmethod
+    def test_all_providers(cls) -> List[Dict]:
+        """并发测试所有已启用的提供商
+
+        网络请求在线程池中并发执行；读库与写日志仍在调用线程完成，
+        避免工作线程各自创建 thread-local 连接。
+        """
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT {cls._PROVIDER_COLUMNS}
+            FROM ai_providers
+            WHERE is_active = 1
+            ORDER BY priority DESC, id ASC
+        """)
+        providers = [cls._provider_from_row(row) for row in cur.fetchall()]
+
+        results = {}
+        pending = []
+        for provider in providers:
+            if not provider['api_key']:
+                results[provider['id']] = (False, 'API Key未配置', None)
+                continue
+            cached = cls._cached_test(provider)
+            if cached is not None:
+                results[provider['id']] = (True, '连接成功', cached)
+            else:
+                pending.append(provider)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(cls.TEST_MAX_WORKERS, len(pending))) as executor:
+                outcomes = list(executor.map(cls._probe_provider, pending))
+            for provider, outcome in zip(pending, outcomes):
+                results[provider['id']] = cls._record_test(provider, outcome)
+
+        return [
+            {
+                'provider_id': provider['id'],
+                'name': provider['name'],
+                'success': results[provider['id']][0],
+                'message': results[provider['id']][1],
+                'result': results[provider['id']][2]
+            }
+            for provider in providers
+        ]
 
     @classmethod
     def log_usage(cls, provider_id: int, provider_name: str, model: str,
@@ -667,21 +760,25 @@ class AIConfigService:
 
     @classmethod
     def get_usage_logs(cls, page: int = 1, per_page: int = 50) -> Tuple[List[Dict], int]:
-        """获取使用日志列表"""
+        """获取使用日志列表（页码分页，总数缓存 USAGE_TOTAL_TTL 秒）"""
         conn = get_db()
         cur = conn.cursor()
 
         # 获取总数
-        cur.execute("SELECT COUNT(*) AS cnt FROM ai_usage_logs")
-        row = cur.fetchone() or {}
-        total = row.get('cnt') or 0
-
-        # 获取分页数据
+        now = time.time()
+        if cls._usage_total_cache is None or now - cls._usage_total_time >= cls.USAGE_TOTAL_TTL:
+            cur.execute("SELECT COUNT(*) AS cnt FROM ai_usage_logs")
+            row = cur.fetchone() or {}
+            cls._usage_total_cache = row.get('cnt') or 0
+            cls._usage_total_time = now
+        total = cls._usage_total_cache
+
+        # 获取分页数据（id 自增与 created_at 同序，按主键倒序免排序）
         offset = (page - 1) * per_page
         cur.execute("""
             SELECT id, provider_name, model, tokens_used, success, error_message, request_type, created_at
             FROM ai_usage_logs
-            ORDER BY created_at DESC
+            ORDER BY id DESC
             LIMIT %s OFFSET %s
         """, (per_page, offset))
 
@@ -689,6 +786,38 @@ class AIConfigService:
 
         return logs, total
 
+    @classmethod
+    def get_usage_logs_before(cls, before_id: Optional[int], per_page: int = 50) -> Tuple[List[Dict], Optional[int]]:
+        """获取使用日志列表（游标分页，不统计总数）
+
+        Args:
+            before_id: 上一页最后一条的 id；None 表示第一页
+            per_page: 每页条数
+
+        Returns:
+            (日志列表, 下一页游标)；没有下一页时游标为 None
+        """
+        conn = get_db()
+        cur = conn.cursor()
+
+        where = "WHERE id < %s" if before_id else ""
+        params = (before_id, per_page + 1) if before_id else (per_page + 1,)
+        cur.execute(f"""
+            SELECT id, provider_name, model, tokens_used, success, error_message, request_type, created_at
+            FROM ai_usage_logs
+            {where}
+            ORDER BY id DESC
+            LIMIT %s
+        """, params)
+
+        logs = [dict(row) for row in cur.fetchall()]
+        next_cursor = None
+        if len(logs) > per_page:
+            logs = logs[:per_page]
+            next_cursor = logs[-1]['id']
+
+        return logs, next_cursor
+
 
 # 单例服务
 ai_config_service = AIConfigService()
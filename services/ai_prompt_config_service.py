@@ -16,6 +16,7 @@ AI Prompt Configuration Service
 - 重置单个配置为默认值
 - 重置所有配置为默认值
 """
+import time
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
@@ -58,6 +59,17 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
     # 配置键的顺序（用于构建提示语）
     CONFIG_ORDER = ["risk_profile", "training_gap", "root_cause", "prediction", "measures"]
 
+    # 配置列表缓存（读多写少；写操作主动失效，TTL 兜底其他 worker 的修改）
+    _configs_cache: Optional[List[Dict]] = None
+    _cache_time: float = 0
+    CACHE_TTL = 300  # 5分钟缓存
+
+    @classmethod
+    def clear_cache(cls):
+        """清除配置缓存"""
+        cls._configs_cache = None
+        cls._cache_time = 0
+
     @classmethod
     def get_all_configs(cls) -> List[Dict]:
         """
@@ -66,6 +78,11 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
         Returns:
             配置列表，按显示顺序排列
         """
+        current_time = time.time()
+        if cls._configs_cache is not None and (current_time - cls._cache_time) < cls.CACHE_TTL:
+            # 返回副本，避免调用方修改字典污染进程级缓存
+            return [dict(c) for c in cls._configs_cache]
+
         try:
             from models.database import get_db
             conn = get_db()
@@ -83,7 +100,7 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
                 # 数据库中没有配置，返回硬编码默认值
                 return cls._get_fallback_configs_list()
 
-            return [
+            configs = [
                 {
                     'id': row['id'],
                     'config_key': row['config_key'],
@@ -96,6 +113,11 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
                 }
                 for row in rows
             ]
+
+            # 仅缓存数据库结果，回退值不缓存以便库恢复后立即生效
+            cls._configs_cache = configs
+            cls._cache_time = current_time
+            return [dict(c) for c in configs]
         except Exception as e:
             print(f"[AIPromptConfigService] 获取配置失败: {e}")
             return cls._get_fallback_configs_list()
@@ -230,7 +252,8 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
         Returns:
             (success, message) 元组
         """
-        if not new_instruction or not new_instruction.strip():
+        new_instruction = (new_instruction or '').strip()
+        if not new_instruction:
             return False, "指令内容不能为空"
 
         try:
@@ -249,9 +272,10 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
                 UPDATE ai_analysis_config
                 SET current_instruction = %s, updated_at = %s
                 WHERE config_key = %s
-            """, (new_instruction.strip(), now, config_key))
+            """, (new_instruction, now, config_key))
             conn.commit()
 
+            cls.clear_cache()
             return True, "配置更新成功"
         except Exception as e:
             print(f"[AIPromptConfigService] 更新配置失败 ({config_key}): {e}")
@@ -293,6 +317,7 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
             """, (now, config_key))
             conn.commit()
 
+            cls.clear_cache()
             return True, "配置已重置为默认值"
         except Exception as e:
             print(f"[AIPromptConfigService] 重置配置失败 ({config_key}): {e}")
@@ -319,6 +344,7 @@ C. **状态型异常** (State Anomaly): 近期家庭变故、疲劳或情绪波
             affected = cur.rowcount
             conn.commit()
 
+            cls.clear_cache()
             return True, f"已重置 {affected} 个配置项为默认值"
         except Exception as e:
             print(f"[AIPromptConfigService] 重置所有配置失败: {e}")
@@ -13,9 +13,17 @@ from typing import Dict, Tuple, Optional, List
 from datetime import datetime
 from models.database import get_db
 from repositories.algorithm_config_repo import AlgorithmConfigRepo
+from services.domain.personnel_algo import (
+    calculate_performance_score_monthly,
+    calculate_safety_score_dual_track,
+    calculate_training_score_with_penalty
+)
 
 _repo = AlgorithmConfigRepo
 
+# 模拟计算：配置缺省时使用的综合评分权重（只读常量，模块加载时构建一次）
+_DEFAULT_SCORE_WEIGHTS = {"performance": 0.35, "safety": 0.30, "training": 0.20}
+
 
 class AlgorithmConfigService:
     """算法配置服务 - 立即生效模式"""
@@ -26,6 +34,12 @@ class AlgorithmConfigService:
     _cache_ttl: int = 300  # 5分钟缓存
     _cache_version: Optional[int] = None
 
+    # 最新日志首页缓存（写操作经 clear_cache 失效，TTL 兜底其他 worker 的写入）
+    _logs_cache: Optional[Tuple[List[dict], int]] = None
+    _logs_cache_time: float = 0
+    _logs_cache_ttl: int = 30
+    LOGS_DEFAULT_LIMIT = 50
+
     @classmethod
     def get_active_config(cls) -> dict:
         """
@@ -327,13 +341,6 @@ class AlgorithmConfigService:
         Returns:
             dict: 模拟计算结果
         """
-        # 导入算法函数（避免循环导入）
-        from services.domain.personnel_algo import (
-            calculate_performance_score_monthly,
-            calculate_safety_score_dual_track,
-            calculate_training_score_with_penalty
-        )
-
         results = {
             "performance": [],
             "safety": [],
@@ -400,9 +407,9 @@ class AlgorithmConfigService:
                 training_score = results["training"][0]["score"]
 
                 comprehensive_score = (
-                    perf_score * weights.get("performance", 0.35) +
-                    safety_score * weights.get("safety", 0.30) +
-                    training_score * weights.get("training", 0.20)
+                    perf_score * weights.get("performance", _DEFAULT_SCORE_WEIGHTS["performance"]) +
+                    safety_score * weights.get("safety", _DEFAULT_SCORE_WEIGHTS["safety"]) +
+                    training_score * weights.get("training", _DEFAULT_SCORE_WEIGHTS["training"])
                 )
                 results["comprehensive"].append({
                     "score": round(comprehensive_score, 1),
@@ -536,17 +543,27 @@ class AlgorithmConfigService:
             return False, f"校验异常: {str(e)}"
 
     @classmethod
-    def get_logs(cls, limit: int = 50, offset: int = 0) -> List[dict]:
+    def get_logs(cls, limit: int = 50, offset: int = 0) -> Tuple[List[dict], int]:
         """
         获取配置变更日志
 
+        仅缓存默认首页（offset=0, limit=50），深分页始终查库。
+
         Args:
             limit: 返回记录数
             offset: 分页偏移
 
         Returns:
-            List[dict]: 日志列表
+            Tuple[List[dict], int]: (日志列表, 日志总数)
         """
+        is_first_page = offset == 0 and limit == cls.LOGS_DEFAULT_LIMIT
+        current_time = time.time()
+        if (is_first_page and cls._logs_cache is not None and
+                (current_time - cls._logs_cache_time) < cls._logs_cache_ttl):
+            # 返回列表副本，避免调用方增删元素污染缓存的首页
+            logs, total = cls._logs_cache
+            return list(logs), total
+
         conn = get_db()
         cur = conn.cursor()
 
@@ -566,7 +583,15 @@ class AlgorithmConfigService:
                 "config_version": row.get('config_version')
             })
 
-        return logs
+        # 窗口计数随每行返回；越过末页时无行可取，单独 COUNT
+        total = rows[0]['total'] if rows else _repo.count_logs(cur)
+
+        if is_first_page:
+            cls._logs_cache = (logs, total)
+            cls._logs_cache_time = current_time
+            return list(logs), total
+
+        return logs, total
 
     @classmethod
     def get_log_detail(cls, log_id: int) -> Optional[dict]:
@@ -660,3 +685,5 @@ class AlgorithmConfigService:
         cls._cache = None
         cls._cache_time = 0
         cls._cache_version = None
+        cls._logs_cache = None
+        cls._logs_cache_time = 0
@@ -10,7 +10,7 @@ import os
 import json
 import logging
 
-from models.database import get_db
+from models.database import get_db, Cursor
 from services.domain.pdf_parser import extract_text_from_pdf, parse_pdf_text
 from services.task_manager import TaskManager
 
@@ -65,40 +65,36 @@ def _run_performance_import(task_tracker, file_path, file_name,
         task_tracker.progress = 50
         task_tracker.message = "权限过滤..."
         valid_emp_nos = set()
+        emp_list = list(dict.fromkeys(r['emp_no'] for r in rows))
+        placeholders = ','.join(['%s'] * len(emp_list))
+        # 只取单列：用元组游标，免去每行构造 dict
+        roster_cur = conn.cursor(Cursor)
 
         if user_info['role'] == 'admin':
-            emp_list = [r['emp_no'] for r in rows]
-            if emp_list:
-                placeholders = ','.join(['%s'] * len(emp_list))
-                cur.execute(
-                    f"SELECT emp_no FROM employees WHERE emp_no IN ({placeholders})",
-                    emp_list
-                )
-                valid_emp_nos = {r['emp_no'] for r in cur.fetchall()}
+            roster_cur.execute(
+                f"SELECT emp_no FROM employees WHERE emp_no IN ({placeholders})",
+                emp_list
+            )
+            valid_emp_nos = {emp_no for (emp_no,) in roster_cur}
         else:
             dept_id = user_info['department_id']
             if dept_id:
                 path = user_info.get('path') or f"/{dept_id}"
-                cur.execute(
-                    "SELECT id FROM departments WHERE path LIKE %s OR id = %s",
-                    (f"{path}/%", dept_id)
-                )
-                accessible_dept_ids = [row['id'] for row in cur.fetchall()]
-
-                if accessible_dept_ids:
-                    emp_list = [r['emp_no'] for r in rows]
-                    if emp_list:
-                        placeholders = ','.join(['%s'] * len(emp_list))
-                        dept_placeholders = ','.join(['%s'] * len(accessible_dept_ids))
-                        sql = f"""
-                            SELECT emp_no FROM employees
-                            WHERE emp_no IN ({placeholders})
-                            AND department_id IN ({dept_placeholders})
-                        """
-                        cur.execute(sql, emp_list + accessible_dept_ids)
-                        valid_emp_nos = {r['emp_no'] for r in cur.fetchall()}
-
-        filtered = [r for r in rows if r["emp_no"] in valid_emp_nos]
+                # 部门子树过滤并入同一条语句，一次往返完成花名册校验
+                roster_cur.execute(f"""
+                    SELECT e.emp_no
+                    FROM employees e
+                    JOIN departments d ON d.id = e.department_id
+                    WHERE e.emp_no IN ({placeholders})
+                      AND (d.path LIKE %s OR d.id = %s)
+                """, emp_list + [f"{path}/%", dept_id])
+                valid_emp_nos = {emp_no for (emp_no,) in roster_cur}
+
+        # 常见情况：PDF 中的工号全部在花名册/权限内，直接沿用原列表
+        if len(valid_emp_nos) == len(emp_list):
+            filtered = rows
+        else:
+            filtered = [r for r in rows if r["emp_no"] in valid_emp_nos]
         skipped_count = len(rows) - len(filtered)
 
         if not filtered:
@@ -12,9 +12,12 @@ Bootstrap Service - 系统初始化引导逻辑
 """
 import os
 import json
+import logging
 from datetime import datetime
 from models.database import get_db, close_db
 
+logger = logging.getLogger(__name__)
+
 
 def init_algorithm_config():
     """初始化算法配置预设
@@ -31,10 +34,8 @@ def init_algorithm_config():
 
     # 检查算法预设表是否存在且为空
     try:
-        cur.execute("SELECT COUNT(1) as cnt FROM algorithm_presets")
-        result = cur.fetchone()
-        count = result['cnt'] if result else 0
-        if count > 0:
+        cur.execute("SELECT EXISTS(SELECT 1 FROM algorithm_presets) AS seeded")
+        if cur.fetchone()['seeded']:
             return  # 已初始化
     except Exception:
         return  # 表不存在，跳过
@@ -49,7 +50,7 @@ def init_algorithm_config():
         except FileNotFoundError:
             preset_payload = None
         except Exception as e:
-            print(f"读取初始化预设失败: {e}")
+            logger.warning("读取初始化预设失败: %s", e)
             preset_payload = None
 
         # 构建默认配置（标准、严格、宽松三档）
@@ -6,6 +6,8 @@ PDF 解析领域函数
 消除 services -> blueprints 的反向依赖。
 """
 import re
+from itertools import islice
+from operator import itemgetter
 
 # PDF解析正则表达式
 HEADER_PERIOD_RE = re.compile(r"考核周期\s+(\d{4})[/-](\d{1,2})[/-](\d{1,2})")
@@ -16,18 +18,75 @@ ROW_RE = re.compile(
     r"(?P<grade>A|B\+|B|C|D)\s+"
     r"(?P<score>\d+(?:\.\d+)?)\s+"
 )
+# 与 ROW_RE 等价的整段扫描版本：字段间空白限定在行内，逐行匹配交给 finditer 在 C 层完成
+_ROW_SCAN_RE = re.compile(
+    r"^[^\S\n]*\d+[^\S\n]+"
+    r"(?P<emp_no>\d{1,20})[^\S\n]+"
+    r"(?P<name>[\u4e00-\u9fa5A-Za-z·.\-]{1,30})[^\S\n]+"
+    r"(?P<grade>A|B\+|B|C|D)[^\S\n]+"
+    r"(?P<score>\d+(?:\.\d+)?)[^\S\n]+(?=[^\s])",
+    re.MULTILINE
+)
 
 
-def extract_text_from_pdf(pdf_path):
-    """从PDF提取文本"""
-    text = ""
+def _pdfplumber_page_text(page):
+    """提取单页文本后立即释放该页解析出的对象缓存，避免大文件内存随页数累积"""
+    try:
+        return f"{page.extract_text() or ''}\n"
+    finally:
+        page.flush_cache()
+
+
+# PyMuPDF 按单词坐标重组行时，同一行内允许的基线偏差（pt，与 pdfplumber 默认 y_tolerance 一致）
+_LINE_Y_TOLERANCE = 3
+
+
+def _pymupdf_page_text(page):
+    """按坐标把单词重组为行（与 pdfplumber 一致：同一基线的表格单元格输出在同一行）
+
+    get_text("text") 以文本块为单位输出，表格每个单元格常被拆成单独一行，
+    ROW_RE 依赖"一条记录占一行"，因此改用 words 自行分行。
+    """
+    lines = []
+    current, baseline = [], None
+    for x0, _, _, y1, word, *_ in sorted(page.get_text("words"), key=itemgetter(3, 0)):
+        if baseline is not None and y1 - baseline > _LINE_Y_TOLERANCE:
+            lines.append(current)
+            current = []
+        if not current:
+            baseline = y1
+        current.append((x0, word))
+    if current:
+        lines.append(current)
+    return "".join(" ".join(word for _, word in sorted(line)) + "\n" for line in lines)
+
+
+def _pymupdf_text(pdf_path, max_pages=None):
+    """PyMuPDF（MuPDF C 引擎）提取文本；未安装时抛出 ImportError"""
+    import pymupdf
+    with pymupdf.open(pdf_path) as doc:
+        page_count = doc.page_count if max_pages is None else min(max_pages, doc.page_count)
+        return "".join(_pymupdf_page_text(doc[i]) for i in range(page_count))
+
+
+def _extract_text(pdf_path, max_pages=None):
+    """依次尝试 PyMuPDF → pdfplumber → PyPDF2 提取前 max_pages 页文本，均失败时返回空串"""
+    # 优先 PyMuPDF：比 pdfplumber（pdfminer 纯 Python 解析）快一个数量级
+    try:
+        text = _pymupdf_text(pdf_path, max_pages)
+        if text.strip():
+            return text
+    except ImportError:
+        pass
+    except Exception as exc:
+        print("PyMuPDF failed:", exc)
+
+    # 逐页文本收集后一次 join，避免整篇字符串反复 += 拷贝
     try:
         import pdfplumber
         with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                # 移除tolerance参数以提升速度
-                text += page.extract_text() or ""
-                text += "\n"
+            # 移除tolerance参数以提升速度
+            text = "".join(_pdfplumber_page_text(page) for page in islice(pdf.pages, max_pages))
         if text.strip():
             return text
     except Exception as exc:
@@ -36,12 +95,24 @@ def extract_text_from_pdf(pdf_path):
     try:
         from PyPDF2 import PdfReader
         reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            text += (page.extract_text() or "") + "\n"
+        text = "".join(f"{page.extract_text() or ''}\n" for page in islice(reader.pages, max_pages))
         if text.strip():
             return text
     except Exception as exc:
         print("PyPDF2 failed:", exc)
+    return ""
+
+
+def extract_first_page_text(pdf_path):
+    """仅提取首页文本（用于快速识别表头考核周期），无法提取时返回空串"""
+    return _extract_text(pdf_path, max_pages=1)
+
+
+def extract_text_from_pdf(pdf_path):
+    """从PDF提取文本"""
+    text = _extract_text(pdf_path)
+    if text:
+        return text
     raise RuntimeError("无法从PDF提取文本，请确认PDF包含文本层并非扫描件。")
 
 
@@ -52,17 +123,15 @@ def parse_pdf_text(text: str):
     if m:
         year = int(m.group(1))
         month = int(m.group(2))
-    rows = []
-    for line in text.splitlines():
-        line = line.strip()
-        m = ROW_RE.match(line)
-        if not m:
-            continue
-        d = m.groupdict()
-        rows.append({
-            "emp_no": d["emp_no"],
-            "name": d["name"],
-            "grade": d["grade"],
-            "score": float(d["score"]),
-        })
+    # 统一换行符（splitlines 识别的行界均转为 \n），与逐行 strip 后匹配的结果一致
+    normalized = "\n".join(text.splitlines())
+    rows = [
+        {
+            "emp_no": m.group("emp_no"),
+            "name": m.group("name"),
+            "grade": m.group("grade"),
+            "score": float(m.group("score")),
+        }
+        for m in _ROW_SCAN_RE.finditer(normalized)
+    ]
     return year, month, rows
@@ -896,10 +896,7 @@ def calculate_learning_ability_longterm(
     slope = 0.0
     if len(history_list) >= 2:
         try:
-            x = np.arange(len(history_list))
-            y = np.array(history_list)
-            res_poly = np.polyfit(x, y, 1)
-            slope = float(res_poly[0])
+            slope = _linear_slope(history_list)
         except Exception:
             pass
 
@@ -923,6 +920,20 @@ def calculate_learning_ability_longterm(
     }
 
 
+def _linear_slope(values: List[float]) -> float:
+    """
+    一次线性拟合斜率（最小二乘闭式解，等价于 np.polyfit(x, y, 1)[0]）
+
+    x 固定为 0..n-1，无需构造矩阵走 LAPACK 求解。
+    """
+    n = len(values)
+    x_mean = (n - 1) / 2.0
+    y_mean = sum(values) / n
+    numerator = sum((i - x_mean) * (v - y_mean) for i, v in enumerate(values))
+    denominator = n * (n * n - 1) / 12.0  # Σ(i - x̄)²
+    return float(numerator / denominator)
+
+
 def calculate_stability_score(
     birth_date: Optional[str],
     work_start_date: Optional[str],
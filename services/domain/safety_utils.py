@@ -7,8 +7,11 @@
 供 blueprints.safety / blueprints.personnel / services 共同引用。
 """
 import re
+from functools import lru_cache
 
 
+# 考核情况多为少量固定表述，且同一条记录在多个统计口径中会被反复解析：按文本缓存结果
+@lru_cache(maxsize=4096)
 def extract_score_from_assessment(assessment):
     """
     从考核情况中提取分值
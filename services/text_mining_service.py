@@ -21,6 +21,11 @@ class TextMiningService:
     _cache_signature: Optional[str] = None
     CACHE_TTL = 300  # 5 minutes cache
 
+    # Category stats cache, dropped together with the stopwords cache
+    _stats_cache: Optional[Dict[str, int]] = None
+    _stats_timestamp: float = 0.0
+    STATS_CACHE_TTL = 30  # seconds
+
     @classmethod
     def _load_stopwords(cls, force_reload: bool = False) -> Set[str]:
         """
@@ -63,6 +68,43 @@ class TextMiningService:
         cls._stopwords_cache = None
         cls._cache_timestamp = None
         cls._cache_signature = None
+        cls._stats_cache = None
+
+    @classmethod
+    def get_category_stats(cls) -> Dict[str, int]:
+        """
+        Get stopword counts by category (cached).
+
+        The cache is dropped by clear_cache(), and otherwise expires
+        after STATS_CACHE_TTL so writes from other workers show up too.
+
+        Returns:
+            {'total': int, 'builtin': int, 'custom': int}
+        """
+        import time
+
+        current_time = time.time()
+        if (cls._stats_cache is not None and
+            current_time - cls._stats_timestamp < cls.STATS_CACHE_TTL):
+            return cls._stats_cache
+
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT category, COUNT(*) AS count
+            FROM stopwords
+            GROUP BY category
+        """)
+        counts = {row['category']: row['count'] for row in cur.fetchall()}
+
+        cls._stats_cache = {
+            'total': sum(counts.values()),
+            'builtin': counts.get('builtin', 0),
+            'custom': counts.get('custom', 0)
+        }
+        cls._stats_timestamp = current_time
+
+        return cls._stats_cache
 
     @classmethod
     def _get_stopwords_signature(cls) -> str:
@@ -119,8 +119,8 @@ def test_version_control():
         # 8. 检查性能索引
         print("\n[8] 检查部分性能索引...")
         index_samples = [
-            ('employees', 'idx_employees_emp_no'),
-            ('performance_records', 'idx_perf_emp_no'),
+            ('employees', 'idx_employees_dept_id'),
+            ('performance_records', 'idx_perf_year_month'),
             ('training_records', 'idx_training_emp_date_composite')
         ]
 
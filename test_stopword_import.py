@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停用词文件解析测试脚本
+验证上传流（Werkzeug 使用 SpooledTemporaryFile）在 UTF-8 / GBK 编码下均可解析
+"""
+import tempfile
+
+from blueprints.system_config import _parse_stopword_file
+
+SAMPLE_LINES = ['的', '了', '', '  是  ', '的', '乘务员' * 20]
+
+
+def _spooled_upload(encoding):
+    """构造与 Werkzeug 上传流相同类型的文件对象"""
+    stream = tempfile.SpooledTemporaryFile(max_size=500 * 1024)
+    stream.write('\r\n'.join(SAMPLE_LINES).encode(encoding))
+    stream.seek(0)
+    return stream
+
+
+def test_parse_stopword_file():
+    """测试 UTF-8 与 GBK 上传文件的解析结果一致"""
+    for encoding in ('utf-8', 'gbk'):
+        with _spooled_upload(encoding) as stream:
+            total, words = _parse_stopword_file(stream)
+        # 空行不计数；超过 50 字的词计数但不导入；重复词去重且保持顺序
+        assert total == 5, (encoding, total)
+        assert words == ['的', '了', '是'], (encoding, words)
+
+
+if __name__ == '__main__':
+    test_parse_stopword_file()
+    print("✓ 停用词文件解析测试通过")
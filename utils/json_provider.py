@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON provider module
+基于 orjson 的 Flask JSON 序列化（orjson 未安装时沿用 Flask 默认实现）
+"""
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj):
+    """orjson 无法原生处理的类型：仅对这几类做 Python 侧转换"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # date/datetime、UUID、dataclass 等沿用 Flask 默认规则，保持输出格式不变
+    return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify 的 orjson 实现
+
+    - datetime 仍按 Flask 默认输出 HTTP 日期格式，前端解析逻辑无需改动
+    - numpy 标量/数组直接序列化，无需手动 float()
+    """
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('separators', None)
+        if kwargs:
+            # 其他 json.dumps 参数 orjson 不支持，交回默认实现
+            return super().dumps(obj, indent=indent, **kwargs)
+
+        option = (orjson.OPT_PASSTHROUGH_DATETIME |
+                  orjson.OPT_NON_STR_KEYS |
+                  orjson.OPT_SERIALIZE_NUMPY)
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+
+def init_json_provider(application):
+    """orjson 可用时替换应用的 JSON provider
+
+    无论是否启用 orjson，均关闭键排序与调试缩进：前端不依赖键顺序，
+    紧凑输出可省去排序与多余空白的开销。
+    """
+    if ORJSON_AVAILABLE:
+        application.json = OrjsonProvider(application)
+    application.json.sort_keys = False
+    application.json.compact = True